@@ -0,0 +1,256 @@
+"""Historical backfill: `python -m app.backfill --topic cricket --since 2024-01-01`.
+
+Splits [since, until) into publishedAfter/publishedBefore windows and walks them concurrently across the
+API key pool under a quota budget, bulk-indexing every page. The windows still to do are checkpointed after
+every change, so running the same command again resumes an interrupted run.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import (
+    BACKFILL_CONCURRENCY, BACKFILL_MAX_PAGES_PER_WINDOW, BACKFILL_WINDOW_HOURS, INGEST_STATE_PATH
+)
+from . import es_utils
+from . import yt_utils
+from . import state_utils
+from . import enrichment
+from . import worker
+
+logger = logging.getLogger(__name__)
+
+Window = Tuple[datetime, datetime]
+
+
+def _parse_time(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def default_checkpoint_path(topic: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-') or "topic"
+    return os.path.join(os.path.dirname(INGEST_STATE_PATH), f"backfill_{slug}.json")
+
+def plan_windows(since: datetime, until: datetime, window: timedelta) -> List[Window]:
+    """Splits [since, until) into consecutive windows, newest first."""
+    windows = []
+    end = until
+    while end > since:
+        start = max(since, end - window)
+        windows.append((start, end))
+        end = start
+    return windows
+
+
+class BackfillRun:
+    """One resumable backfill of a topic over a date range."""
+
+    def __init__(
+        self,
+        topic: str,
+        since: datetime,
+        until: Optional[datetime],
+        window: timedelta,
+        concurrency: int,
+        max_units: int,
+        max_pages_per_window: int,
+        checkpoint_path: str
+    ):
+        self.topic = topic
+        self.since = since
+        self.until = until
+        self.window = window
+        self.concurrency = concurrency
+        self.units_left = max_units
+        self.max_pages_per_window = max_pages_per_window
+        self.checkpoint_path = checkpoint_path
+        self.pending: List[Window] = []
+        self.units_spent = 0
+        self.indexed = 0
+        self.failed_windows = 0
+        self.out_of_quota = False
+        self._save_lock = asyncio.Lock()
+
+    def load_or_plan(self):
+        """Resumes from the checkpoint if it belongs to this run, otherwise plans all windows.
+
+        Without an explicit `until`, a resumed run keeps the end time of the run it continues.
+        """
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if self.until is None and state.get("until"):
+                self.until = _parse_time(state["until"])
+            if (state.get("topic"), state.get("since"), state.get("until")) != (self.topic, self.since.isoformat(), self.until.isoformat()):
+                raise ValueError(
+                    f"Checkpoint '{self.checkpoint_path}' belongs to a different backfill "
+                    f"({state.get('topic')} {state.get('since')}..{state.get('until')}). Remove it or pass --checkpoint."
+                )
+            self.pending = [(_parse_time(start), _parse_time(end)) for start, end in state.get("pending", [])]
+            self.units_spent = state.get("units_spent", 0)
+            self.indexed = state.get("indexed", 0)
+            logger.info(f"Resuming backfill for '{self.topic}': {len(self.pending)} window(s) left.")
+        else:
+            if self.until is None:
+                self.until = datetime.now(timezone.utc).replace(microsecond=0)
+            self.pending = plan_windows(self.since, self.until, self.window)
+            logger.info(f"Planned {len(self.pending)} window(s) of {self.window} for '{self.topic}'.")
+
+    async def save(self):
+        state = {
+            "topic": self.topic,
+            "since": self.since.isoformat(),
+            "until": self.until.isoformat(),
+            "pending": [[start.isoformat(), end.isoformat()] for start, end in self.pending],
+            "units_spent": self.units_spent,
+            "indexed": self.indexed,
+            "saved_at": datetime.now(timezone.utc).isoformat()
+        }
+        async with self._save_lock: # keeps an older snapshot from replacing a newer one
+            await asyncio.to_thread(state_utils._write_atomically, self.checkpoint_path, json.dumps(state))
+        # Lets the next backfill run and the fetcher leader start from what this run spent
+        await state_utils.save_key_usage()
+
+    async def _walk(self, window: Window) -> Optional[Window]:
+        """Fetches and indexes one window newest first. Returns the older part still to fetch, or None when done.
+
+        A window is cut short when it runs out of pages (YouTube stops paging deep result sets) or quota;
+        results are newest first, so the remainder is [start, oldest video fetched].
+        """
+        start, end = window
+        page_token: Optional[str] = None
+        oldest: Optional[datetime] = None
+        pages = 0
+        while True:
+            remainder = (start, min(end, oldest + timedelta(seconds=1))) if oldest else window
+            if pages >= self.max_pages_per_window:
+                if remainder == window:
+                    # Every fetched video sits in the window's last second; narrowing further is impossible
+                    logger.warning(f"Window {start.isoformat()}..{end.isoformat()} cannot be split further. Older results are skipped.")
+                    return None
+                logger.info(f"Window {start.isoformat()}..{end.isoformat()} still has results after {pages} pages. Re-queuing the older part.")
+                return remainder
+            if self.units_left < yt_utils.SEARCH_LIST_COST:
+                self.out_of_quota = True
+                return remainder
+            api_key = yt_utils.get_next_api_key()
+            if not api_key:
+                self.out_of_quota = True
+                return remainder
+            self.units_left -= yt_utils.SEARCH_LIST_COST
+            self.units_spent += yt_utils.SEARCH_LIST_COST
+            # fetch_search_page adds a one second buffer to publishedAfter; undo it so windows meet exactly
+            videos, page_token = await yt_utils.fetch_search_page(
+                self.topic, api_key, start - timedelta(seconds=1), end, page_token, raise_on_error=True
+            )
+            pages += 1
+            if videos:
+                result = await es_utils.bulk_index_videos(videos)
+                if result.failed:
+                    raise RuntimeError(f"{len(result.failed)} of {len(videos)} videos failed to index")
+                self.indexed += len(result.indexed)
+                # The refresh scan only covers recent videos, so backfilled history gets its stats here
+                enrichment.enricher.submit_videos(videos)
+                await enrichment.enricher.flush()
+                page_oldest = min(video.published_at for video in videos)
+                oldest = page_oldest if oldest is None else min(oldest, page_oldest)
+            if not page_token:
+                return None
+
+    async def _run_windows(self, queue: asyncio.Queue):
+        while True:
+            window = await queue.get()
+            try:
+                if self.out_of_quota:
+                    continue # stays pending for the next run
+                remainder = await self._walk(window)
+                index = self.pending.index(window)
+                if remainder is None:
+                    del self.pending[index]
+                else:
+                    self.pending[index] = remainder
+                    if not self.out_of_quota:
+                        queue.put_nowait(remainder)
+                await self.save()
+            except Exception as e:
+                # Left pending as a whole; re-fetching it on the next run is harmless since writes are by video ID
+                self.failed_windows += 1
+                logger.error(f"Backfill window {window[0].isoformat()}..{window[1].isoformat()} failed: {e}", exc_info=True)
+            finally:
+                queue.task_done()
+
+    async def run(self) -> Dict[str, Any]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for window in self.pending:
+            queue.put_nowait(window)
+        tasks = [asyncio.create_task(self._run_windows(queue)) for _ in range(self.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.save()
+        return {
+            "topic": self.topic,
+            "windows_left": len(self.pending),
+            "failed_windows": self.failed_windows,
+            "indexed": self.indexed,
+            "units_spent": self.units_spent,
+            "out_of_quota": self.out_of_quota
+        }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.backfill", description="Backfill a topic's historical videos into Elasticsearch.")
+    parser.add_argument("--topic", required=True, help="Search query to backfill")
+    parser.add_argument("--since", required=True, type=_parse_time, help="Oldest publish time to fetch (ISO 8601, UTC if no offset)")
+    parser.add_argument("--until", type=_parse_time, default=None, help="Newest publish time to fetch (default: now)")
+    parser.add_argument("--window-hours", type=float, default=BACKFILL_WINDOW_HOURS, help="Width of each publishedAfter/publishedBefore window")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY, help="Windows fetched at the same time")
+    parser.add_argument("--max-units", type=int, default=None, help="Quota units this run may spend (default: all estimated remaining)")
+    parser.add_argument("--max-pages-per-window", type=int, default=BACKFILL_MAX_PAGES_PER_WINDOW, help="Pages walked per window before the rest is re-queued")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: data/backfill_<topic>.json)")
+    return parser.parse_args(argv)
+
+async def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    # Quota spent today by the fetcher or an earlier run, so --max-units defaults to what is really left
+    state_utils.load_key_usage()
+    run = BackfillRun(
+        topic=args.topic,
+        since=args.since,
+        until=args.until,
+        window=timedelta(hours=args.window_hours),
+        concurrency=max(args.concurrency, 1),
+        max_units=args.max_units if args.max_units is not None else yt_utils.key_scheduler.total_remaining(),
+        max_pages_per_window=max(args.max_pages_per_window, 1),
+        checkpoint_path=args.checkpoint or default_checkpoint_path(args.topic)
+    )
+    run.load_or_plan()
+    if not run.pending:
+        logger.info("Nothing left to backfill.")
+        return
+
+    try:
+        await worker.setup_clients()
+        summary = await run.run()
+        if not await enrichment.enricher.flush():
+            logger.warning(f"Stats of {enrichment.enricher.stats()['pending']} backfilled videos were not fetched (no quota left).")
+        if run.indexed:
+            await es_utils.publish_ingest_generation()
+        logger.info(f"Backfill finished: {summary}")
+        if summary["windows_left"]:
+            logger.info(f"{summary['windows_left']} window(s) left; rerun the same command to resume.")
+    finally:
+        await yt_utils.close_http_client()
+        await es_utils.close_es_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
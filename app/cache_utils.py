@@ -0,0 +1,78 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .config import SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Bumped by the fetcher after every successfully indexed batch; cached results from older generations are stale
+ingest_generation: int = 0
+
+def bump_generation():
+    """Marks every cached result as stale after new videos were indexed."""
+    global ingest_generation
+    ingest_generation += 1
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a TTL or, if `follow_ingest`, once the ingest generation moves on."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, follow_ingest: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.follow_ingest = follow_ingest
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, generation, value = entry
+        if (self.follow_ingest and generation != ingest_generation) or expires_at <= time.monotonic():
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, ingest_generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "generation": ingest_generation
+        }
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query, used as the cache key."""
+    return " ".join(query.lower().split())
+
+search_cache = TTLCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS)
@@ -1,15 +1,47 @@
 import os
 import logging
-from typing import List, Optional
+from typing import List, Optional, Union
 from dotenv import load_dotenv
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
 logger = logging.getLogger(__name__)
+
+
+def _get_int_env(name: str, default: int) -> int:
+    value = os.getenv(name, str(default))
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid {name} value '{value}'. Using default {default}.")
+        return default
+
+
+def _get_float_env(name: str, default: float) -> float:
+    value = os.getenv(name, str(default))
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Invalid {name} value '{value}'. Using default {default}.")
+        return default
+
+
+def _get_bool_env(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 YOUTUBE_API_KEYS_STR: Optional[str] = os.getenv('YOUTUBE_API_KEYS')
 SEARCH_QUERY: str = os.getenv('SEARCH_QUERY', "cricket")
 
+# topics fetched every cycle; falls back to the single SEARCH_QUERY
+_search_queries_str = os.getenv('SEARCH_QUERIES', "")
+SEARCH_QUERIES: List[str] = [q.strip() for q in _search_queries_str.split(',') if q.strip()] or [SEARCH_QUERY]
+# maximum number of topics fetched concurrently
+FETCH_CONCURRENCY: int = max(_get_int_env('FETCH_CONCURRENCY', 4), 1)
+
 
 _fetch_interval_str = os.getenv('FETCH_INTERVAL_SECONDS', "10")
 try:
@@ -18,8 +50,55 @@ except ValueError:
     logger.warning(f"Invalid FETCH_INTERVAL_SECONDS value '{_fetch_interval_str}'. Using default 10.")
     FETCH_INTERVAL_SECONDS: int = 10
 
+# adaptive polling: FETCH_INTERVAL_SECONDS is each topic's first interval, later ones follow its arrival rate
+POLL_MIN_INTERVAL_SECONDS: float = _get_float_env('POLL_MIN_INTERVAL_SECONDS', 10.0)
+POLL_MAX_INTERVAL_SECONDS: float = _get_float_env('POLL_MAX_INTERVAL_SECONDS', 900.0)
+POLL_TARGET_VIDEOS_PER_POLL: float = _get_float_env('POLL_TARGET_VIDEOS_PER_POLL', 20.0)
+POLL_JITTER: float = min(max(_get_float_env('POLL_JITTER', 0.1), 0.0), 0.5)
+POLL_RATE_SMOOTHING: float = min(max(_get_float_env('POLL_RATE_SMOOTHING', 0.3), 0.01), 1.0)
+
 ELASTICSEARCH_HOST: str = os.getenv('ELASTICSEARCH_HOST', "http://localhost:9200")
 ELASTICSEARCH_INDEX: str = os.getenv('ELASTICSEARCH_INDEX', "youtube_videos")
+# small index holding the fetcher leader lease and the ingest generation
+ELASTICSEARCH_META_INDEX: str = os.getenv('ELASTICSEARCH_META_INDEX', f"{ELASTICSEARCH_INDEX}_meta")
+
+# time-partitioned storage: ELASTICSEARCH_INDEX is the read alias over `<index>-<period>` partitions, each video is
+# written to the partition of its published_at, and partitions older than the retention are deleted (0 keeps all)
+_partition_interval_str = os.getenv('ES_PARTITION_INTERVAL', "month").strip().lower()
+if _partition_interval_str not in ("month", "week", "day"):
+    logger.warning(f"Invalid ES_PARTITION_INTERVAL value '{_partition_interval_str}'. Using default 'month'.")
+    _partition_interval_str = "month"
+ES_PARTITION_INTERVAL: str = _partition_interval_str
+ES_RETENTION_DAYS: int = _get_int_env('ES_RETENTION_DAYS', 0)
+ES_PARTITION_MAINTENANCE_SECONDS: float = _get_float_env('ES_PARTITION_MAINTENANCE_SECONDS', 3600.0)
+
+# fetcher leader election: only the lease holder polls YouTube and writes to Elasticsearch
+FETCHER_LEASE_TTL_SECONDS: float = _get_float_env('FETCHER_LEASE_TTL_SECONDS', 30.0)
+FETCHER_LEASE_RENEW_SECONDS: float = _get_float_env('FETCHER_LEASE_RENEW_SECONDS', 10.0)
+# the leader treats its lease as ending this much earlier than a standby does, to cover clock skew and a slow stop
+FETCHER_LEASE_SAFETY_SECONDS: float = _get_float_env('FETCHER_LEASE_SAFETY_SECONDS', 5.0)
+# also run the (leader-elected) fetcher inside the API process, e.g. for single-process development
+RUN_FETCHER_IN_API: bool = _get_bool_env('RUN_FETCHER_IN_API', False)
+# how often API processes check whether the fetcher indexed something new
+INGEST_WATCH_INTERVAL_SECONDS: float = _get_float_env('INGEST_WATCH_INTERVAL_SECONDS', 2.0)
+
+# local checkpoint holding the fetcher's per-topic watermarks
+INGEST_STATE_PATH: str = os.getenv(
+    'INGEST_STATE_PATH', os.path.join(os.path.dirname(__file__), '..', 'data', 'ingest_state.json')
+)
+# recently indexed video IDs remembered by the fetcher to skip re-writing them (0 disables)
+SEEN_IDS_CAPACITY: int = _get_int_env('SEEN_IDS_CAPACITY', 20000)
+# write-behind queue between the fetcher and Elasticsearch: batches waiting in memory, how long a full
+# queue blocks the fetcher before the batch spills to the journal, and retry backoff for failed writes
+WRITE_QUEUE_MAX_BATCHES: int = max(_get_int_env('WRITE_QUEUE_MAX_BATCHES', 100), 1)
+WRITE_QUEUE_PUT_TIMEOUT_SECONDS: float = _get_float_env('WRITE_QUEUE_PUT_TIMEOUT_SECONDS', 5.0)
+WRITE_RETRY_MAX_ATTEMPTS: int = max(_get_int_env('WRITE_RETRY_MAX_ATTEMPTS', 5), 1)
+WRITE_RETRY_BASE_SECONDS: float = _get_float_env('WRITE_RETRY_BASE_SECONDS', 0.5)
+WRITE_RETRY_MAX_SECONDS: float = _get_float_env('WRITE_RETRY_MAX_SECONDS', 30.0)
+# append-only journal for batches that could not be written, replayed once Elasticsearch is back
+WRITE_JOURNAL_PATH: str = os.getenv(
+    'WRITE_JOURNAL_PATH', os.path.join(os.path.dirname(__file__), '..', 'data', 'write_journal.ndjson')
+)
 
 _default_page_size_str = os.getenv('DEFAULT_PAGE_SIZE', "10")
 try:
@@ -35,6 +114,99 @@ except ValueError:
     logger.warning(f"Invalid MAX_PAGE_SIZE value '{_max_page_size_str}'. Using default 50.")
     MAX_PAGE_SIZE: int = 50
 
+ES_BULK_CHUNK_SIZE: int = _get_int_env('ES_BULK_CHUNK_SIZE', 500)
+
+# refresh behaviour for bulk writes: "false" (default), "true" or "wait_for"
+_bulk_refresh_str = os.getenv('ES_BULK_REFRESH', "false").strip().lower()
+if _bulk_refresh_str not in ("true", "false", "wait_for"):
+    logger.warning(f"Invalid ES_BULK_REFRESH value '{_bulk_refresh_str}'. Using default 'false'.")
+    _bulk_refresh_str = "false"
+ES_BULK_REFRESH: Union[bool, str] = {"true": True, "false": False}.get(_bulk_refresh_str, _bulk_refresh_str)
+# how long a /search point-in-time stays open between page requests
+SEARCH_PIT_KEEP_ALIVE: str = os.getenv('SEARCH_PIT_KEEP_ALIVE', "1m")
+
+# Elasticsearch index.max_result_window: deepest from+size reachable with page numbers
+ES_MAX_RESULT_WINDOW: int = _get_int_env('ES_MAX_RESULT_WINDOW', 10000)
+# cursor-mode /videos counts matches only up to this many (lower bound)
+VIDEOS_APPROX_TOTAL_LIMIT: int = _get_int_env('VIDEOS_APPROX_TOTAL_LIMIT', 10000)
+
+# in-process /search result cache (0 disables); entries are also dropped after every ingest
+SEARCH_CACHE_MAX_ENTRIES: int = _get_int_env('SEARCH_CACHE_MAX_ENTRIES', 1024)
+SEARCH_CACHE_TTL_SECONDS: float = _get_float_env('SEARCH_CACHE_TTL_SECONDS', 30.0)
+
+_TIME_UNIT_SECONDS = {"d": 86400.0, "h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001, "micros": 1e-6, "nanos": 1e-9}
+
+# seconds in an Elasticsearch time value such as "1m" or "30s", None if it cannot be parsed
+def _parse_time_value(value: str) -> Optional[float]:
+    value = value.strip().lower()
+    for unit in sorted(_TIME_UNIT_SECONDS, key=len, reverse=True):
+        if value.endswith(unit):
+            try:
+                return float(value[:-len(unit)]) * _TIME_UNIT_SECONDS[unit]
+            except ValueError:
+                return None
+    return None
+
+# A cached /search page hands out the cursor of its point-in-time, which closes SEARCH_PIT_KEEP_ALIVE after
+# the page was fetched; keep at most half of that window so a client has time to follow the cursor
+_pit_keep_alive_seconds = _parse_time_value(SEARCH_PIT_KEEP_ALIVE)
+if _pit_keep_alive_seconds is not None and SEARCH_CACHE_TTL_SECONDS > _pit_keep_alive_seconds / 2:
+    logger.warning(
+        f"SEARCH_CACHE_TTL_SECONDS ({SEARCH_CACHE_TTL_SECONDS:g}) must stay below SEARCH_PIT_KEEP_ALIVE "
+        f"({SEARCH_PIT_KEEP_ALIVE}). Using {_pit_keep_alive_seconds / 2:g}."
+    )
+    SEARCH_CACHE_TTL_SECONDS = _pit_keep_alive_seconds / 2
+
+# historical backfill (python -m app.backfill): window width, windows fetched at once, pages walked per window
+BACKFILL_WINDOW_HOURS: float = _get_float_env('BACKFILL_WINDOW_HOURS', 24.0)
+BACKFILL_CONCURRENCY: int = _get_int_env('BACKFILL_CONCURRENCY', 4)
+BACKFILL_MAX_PAGES_PER_WINDOW: int = _get_int_env('BACKFILL_MAX_PAGES_PER_WINDOW', 10)
+
+# newest videos kept in memory to answer the first /videos pages without Elasticsearch (0 disables)
+HOT_TIER_SIZE: int = _get_int_env('HOT_TIER_SIZE', 500)
+
+# /suggest type-ahead: default and maximum number of titles returned, and the Elasticsearch time budget
+SUGGEST_DEFAULT_SIZE: int = _get_int_env('SUGGEST_DEFAULT_SIZE', 5)
+SUGGEST_MAX_SIZE: int = _get_int_env('SUGGEST_MAX_SIZE', 10)
+SUGGEST_TIMEOUT: str = os.getenv('SUGGEST_TIMEOUT', "100ms")
+
+# documents per point-in-time slice streamed by /videos/export
+EXPORT_BATCH_SIZE: int = max(_get_int_env('EXPORT_BATCH_SIZE', 1000), 1)
+
+
+# enrichment with videos.list (1 unit per 50 IDs): statistics and duration for newly indexed videos, and
+# periodic refreshes for videos published within the refresh window whose stats are older than the TTL
+ENRICH_ENABLED: bool = _get_bool_env('ENRICH_ENABLED', True)
+ENRICH_BATCH_SIZE: int = min(max(_get_int_env('ENRICH_BATCH_SIZE', 50), 1), 50)
+ENRICH_FLUSH_SECONDS: float = _get_float_env('ENRICH_FLUSH_SECONDS', 30.0)
+ENRICH_STATS_TTL_SECONDS: float = _get_float_env('ENRICH_STATS_TTL_SECONDS', 3600.0)
+ENRICH_CACHE_MAX_ENTRIES: int = _get_int_env('ENRICH_CACHE_MAX_ENTRIES', 50000)
+ENRICH_REFRESH_SECONDS: float = _get_float_env('ENRICH_REFRESH_SECONDS', 3600.0)
+ENRICH_REFRESH_WINDOW_HOURS: float = _get_float_env('ENRICH_REFRESH_WINDOW_HOURS', 48.0)
+ENRICH_REFRESH_MAX_VIDEOS: int = _get_int_env('ENRICH_REFRESH_MAX_VIDEOS', 5000)
+
+# Prometheus metrics: served at /metrics by the API and on METRICS_PORT by the worker (0 = no worker endpoint)
+METRICS_ENABLED: bool = _get_bool_env('METRICS_ENABLED', True)
+METRICS_PORT: int = _get_int_env('METRICS_PORT', 9100)
+# set for `uvicorn --workers N`: the API processes share their samples through files in this (emptied at start) directory
+PROMETHEUS_MULTIPROC_DIR: Optional[str] = os.getenv('PROMETHEUS_MULTIPROC_DIR') or None
+
+# shared HTTP client used for all YouTube Data API calls
+YOUTUBE_HTTP_MAX_CONNECTIONS: int = _get_int_env('YOUTUBE_HTTP_MAX_CONNECTIONS', 20)
+YOUTUBE_HTTP_MAX_KEEPALIVE: int = _get_int_env('YOUTUBE_HTTP_MAX_KEEPALIVE', 10)
+YOUTUBE_HTTP_KEEPALIVE_EXPIRY: float = _get_float_env('YOUTUBE_HTTP_KEEPALIVE_EXPIRY', 120.0)
+YOUTUBE_HTTP_TIMEOUT: float = _get_float_env('YOUTUBE_HTTP_TIMEOUT', 20.0)
+YOUTUBE_HTTP_CONNECT_TIMEOUT: float = _get_float_env('YOUTUBE_HTTP_CONNECT_TIMEOUT', 5.0)
+YOUTUBE_HTTP2: bool = _get_bool_env('YOUTUBE_HTTP2', False)
+
+
+# page walk budget per topic fetch: pages of 50 results, and quota units (0 = no unit cap)
+YOUTUBE_MAX_PAGES_PER_FETCH: int = max(_get_int_env('YOUTUBE_MAX_PAGES_PER_FETCH', 5), 1)
+YOUTUBE_MAX_UNITS_PER_FETCH: int = _get_int_env('YOUTUBE_MAX_UNITS_PER_FETCH', 0)
+
+# daily quota units granted per API key (YouTube Data API default is 10,000)
+YOUTUBE_DAILY_QUOTA_PER_KEY: int = _get_int_env('YOUTUBE_DAILY_QUOTA_PER_KEY', 10000)
+
 
 YOUTUBE_API_KEYS: List[str] = []
 if YOUTUBE_API_KEYS_STR:
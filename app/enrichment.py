@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import (
+    ENRICH_BATCH_SIZE, ENRICH_CACHE_MAX_ENTRIES, ENRICH_ENABLED, ENRICH_FLUSH_SECONDS, ENRICH_REFRESH_MAX_VIDEOS,
+    ENRICH_REFRESH_SECONDS, ENRICH_REFRESH_WINDOW_HOURS, ENRICH_STATS_TTL_SECONDS, ES_MAX_RESULT_WINDOW
+)
+from .pydantic_models import Video
+from .cache_utils import TTLCache
+from . import es_utils
+from . import yt_utils
+
+logger = logging.getLogger(__name__)
+
+
+class StatsEnricher:
+    """Fills in view/like counts and duration of indexed videos with batched videos.list calls.
+
+    IDs arrive from the write path as videos are indexed and from a periodic scan for recent videos with
+    missing or stale stats. They are sent 50 to a call (1 quota unit); IDs fetched within the stats TTL are
+    remembered in a local cache and not requested again.
+    """
+
+    def __init__(self, batch_size: int, cache: TTLCache, max_pending: int):
+        self.batch_size = batch_size
+        self.cache = cache
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[str, str]" = OrderedDict() # video_id -> concrete index holding it
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock() # concurrent flushes (backfill windows) would send the same batch twice
+        self.calls = 0
+        self.enriched = 0
+        self.cache_skipped = 0
+        self.unavailable = 0 # IDs videos.list did not return (deleted or private)
+
+    def start(self):
+        if ENRICH_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Stats enrichment started.")
+
+    async def stop(self):
+        """Stops enrichment; IDs still pending are picked up by the next leader's refresh scan."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def submit(self, targets: Iterable[Tuple[str, str]]):
+        """Queues (video_id, concrete index) pairs for enrichment, skipping IDs enriched within the TTL."""
+        if not ENRICH_ENABLED:
+            return
+        for video_id, index_name in targets:
+            if self.cache.get(video_id) is not None:
+                self.cache_skipped += 1
+                continue
+            self._pending[video_id] = index_name
+        while len(self._pending) > self.max_pending:
+            # The refresh scan finds whatever is dropped here, since its stats are still missing
+            self._pending.popitem(last=False)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def submit_videos(self, videos: List[Video]):
+        self.submit((video.video_id, es_utils.partition_index_name(video.published_at)) for video in videos)
+
+    async def flush(self) -> bool:
+        """Sends pending IDs in batches. Returns False if it stopped early for lack of quota or a failed call."""
+        async with self._flush_lock:
+            return await self._flush_pending()
+
+    async def _flush_pending(self) -> bool:
+        while self._pending:
+            batch = list(islice(self._pending.items(), self.batch_size))
+            api_key = yt_utils.get_next_api_key(cost=yt_utils.VIDEOS_LIST_COST)
+            if not api_key:
+                return False
+            self.calls += 1
+            stats = await yt_utils.fetch_video_stats([video_id for video_id, _ in batch], api_key)
+            if stats is None:
+                return False # the batch stays pending for the next flush
+            for video_id, _ in batch:
+                self._pending.pop(video_id, None)
+            updates = [(index_name, stats[video_id]) for video_id, index_name in batch if video_id in stats]
+            self.unavailable += len(batch) - len(updates)
+            for video_id, _ in batch:
+                if video_id not in stats:
+                    self.cache.set(video_id, False) # deleted or private; no point asking again within the TTL
+            result = await es_utils.update_video_stats(updates)
+            for video_id in result.indexed:
+                self.cache.set(video_id, True)
+            self.enriched += len(result.indexed)
+        return True
+
+    async def refresh_recent(self):
+        """Queues recently published videos whose stats are missing or older than the TTL."""
+        now = datetime.now(timezone.utc)
+        targets = await es_utils.get_videos_needing_stats(
+            published_after=now - timedelta(hours=ENRICH_REFRESH_WINDOW_HOURS),
+            stale_before=now - timedelta(seconds=ENRICH_STATS_TTL_SECONDS),
+            limit=min(ENRICH_REFRESH_MAX_VIDEOS, ES_MAX_RESULT_WINDOW)
+        )
+        if targets:
+            logger.info(f"Refreshing stats of {len(targets)} recent videos.")
+        self.submit(targets)
+
+    async def _run(self):
+        last_refresh: Optional[float] = None
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=ENRICH_FLUSH_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                if last_refresh is None or time.monotonic() - last_refresh >= ENRICH_REFRESH_SECONDS:
+                    last_refresh = time.monotonic()
+                    await self.refresh_recent()
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in stats enrichment loop: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "calls": self.calls,
+            "enriched": self.enriched,
+            "cache_skipped": self.cache_skipped,
+            "unavailable": self.unavailable
+        }
+
+
+# Entries expire with the stats TTL only; new ingests do not make fetched stats stale
+enricher = StatsEnricher(
+    ENRICH_BATCH_SIZE,
+    TTLCache(ENRICH_CACHE_MAX_ENTRIES, ENRICH_STATS_TTL_SECONDS, follow_ingest=False),
+    max_pending=max(ENRICH_CACHE_MAX_ENTRIES, ENRICH_BATCH_SIZE)
+)
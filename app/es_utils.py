@@ -1,11 +1,21 @@
+import base64
+import json
 import logging
-from datetime import datetime,timezone
-from typing import List, Optional, Tuple, Dict, Any
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Set, Tuple, Dict, Any, Union
 
-from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
+from elasticsearch import AsyncElasticsearch, ConflictError, NotFoundError, RequestError
+from elasticsearch.helpers import async_streaming_bulk
 
-from .config import ELASTICSEARCH_HOST, ELASTICSEARCH_INDEX
-from .pydantic_models import Video
+from .config import (
+    ELASTICSEARCH_HOST, ELASTICSEARCH_INDEX, ELASTICSEARCH_META_INDEX, ES_PARTITION_INTERVAL,
+    ES_BULK_CHUNK_SIZE, ES_BULK_REFRESH, SEARCH_PIT_KEEP_ALIVE,
+    VIDEOS_APPROX_TOTAL_LIMIT, EXPORT_BATCH_SIZE, SUGGEST_TIMEOUT
+)
+from .pydantic_models import Video, BulkIndexResult, VideoStats
+from .cache_utils import normalize_query
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -28,41 +38,346 @@ async def close_es_client():
         await es_client.close()
         es_client = None
 
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed, expired or belongs to a different request."""
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Encodes pagination state as an opaque URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise InvalidCursorError("Malformed cursor.") from e
+    if not isinstance(state, dict):
+        raise InvalidCursorError("Malformed cursor.")
+    return state
+
+VIDEO_MAPPINGS = {
+    "properties": {
+        "video_id": {"type": "keyword"},
+        "title": {
+            "type": "text",
+            "analyzer": "standard",
+            # shingles + edge n-grams for /suggest, so type-ahead needs no fuzzy scoring
+            "fields": {"suggest": {"type": "search_as_you_type"}}
+        },
+        "description": {"type": "text", "analyzer": "standard"},
+        "published_at": {"type": "date"},
+        "thumbnails": {"type": "text"},
+        "indexed_at": {"type": "date"},
+        "topic": {"type": "keyword"},
+        "view_count": {"type": "long"},
+        "like_count": {"type": "long"},
+        "duration_seconds": {"type": "integer"},
+        "stats_updated_at": {"type": "date"}
+    }
+}
+
+# Segments sorted newest first, so sorted queries that do not need exact totals can stop early
+PARTITION_SETTINGS = {
+    "index.sort.field": ["published_at", "video_id"],
+    "index.sort.order": ["desc", "desc"]
+}
+
+PARTITION_TEMPLATE_NAME = f"{ELASTICSEARCH_INDEX}-partitions"
+PARTITION_PATTERN = f"{ELASTICSEARCH_INDEX}-*"
+_PARTITION_FORMATS = {"month": "%Y.%m", "week": "%G.w%V", "day": "%Y.%m.%d"}
+
+def partition_index_name(published_at: datetime) -> str:
+    """Concrete partition holding videos published at `published_at`, e.g. `youtube_videos-2024.05`."""
+    published_at = published_at.astimezone(timezone.utc) if published_at.tzinfo else published_at
+    return f"{ELASTICSEARCH_INDEX}-{published_at.strftime(_PARTITION_FORMATS[ES_PARTITION_INTERVAL])}"
+
+def partition_bounds(index_name: str) -> Optional[Tuple[datetime, datetime]]:
+    """[start, end) of the period a partition covers, or None if the name does not match ES_PARTITION_INTERVAL."""
+    suffix = index_name[len(ELASTICSEARCH_INDEX) + 1:]
+    try:
+        if ES_PARTITION_INTERVAL == "week":
+            start = datetime.strptime(f"{suffix}-1", "%G.w%V-%u").replace(tzinfo=timezone.utc)
+            return start, start + timedelta(days=7)
+        start = datetime.strptime(suffix, _PARTITION_FORMATS[ES_PARTITION_INTERVAL]).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    if ES_PARTITION_INTERVAL == "day":
+        return start, start + timedelta(days=1)
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+async def _legacy_index_exists() -> bool:
+    """True if ELASTICSEARCH_INDEX is still a concrete index from before partitioning, not the read alias."""
+    client = get_es_client()
+    return await client.indices.exists(index=ELASTICSEARCH_INDEX) and not await client.indices.exists_alias(name=ELASTICSEARCH_INDEX)
+
 async def ensure_index_exists():
-    """Creates the Elasticsearch index with the correct mapping if it doesn't exist."""
+    """Installs the partition template and makes sure the current partition and the read alias exist.
+
+    Partitions are created from an index template that sorts them by published_at desc and adds each one
+    to the read alias, including partitions created on the fly by a bulk write for an older period.
+    """
     client = get_es_client()
-    index_name = ELASTICSEARCH_INDEX
     try:
-        if not await client.indices.exists(index=index_name):
-            logger.info(f"Index '{index_name}' not found. Creating...")
-            mapping = {
-                "properties": {
-                    "video_id": {"type": "keyword"},
-                    "title": {"type": "text", "analyzer": "standard"},
-                    "description": {"type": "text", "analyzer": "standard"},
-                    "published_at": {"type": "date"},
-                    "thumbnails": {"type": "text"},
-                    "indexed_at": {"type": "date"}
-                }
-            }
-
-            await client.indices.create(index=index_name, mappings=mapping)
-            logger.info(f"Index '{index_name}' created successfully.")
-        else:
-            logger.info(f"Index '{index_name}' already exists.")
+        if await _legacy_index_exists():
+            # Reads keep using the old index until the worker has moved it into partitions; the template (whose
+            # alias has the old index's name) is only installed after that
+            logger.warning(f"'{ELASTICSEARCH_INDEX}' is still a concrete index; it will be migrated into partitions by the fetcher worker.")
+            await _put_added_mappings()
+            return
+        await client.indices.put_index_template(
+            name=PARTITION_TEMPLATE_NAME,
+            index_patterns=[PARTITION_PATTERN],
+            priority=100,
+            template={"settings": PARTITION_SETTINGS, "mappings": VIDEO_MAPPINGS, "aliases": {ELASTICSEARCH_INDEX: {}}}
+        )
+        await ensure_current_partition()
+        await _put_added_mappings()
     except RequestError as e:
-        logger.error(f"Failed to create or check index '{index_name}': {e.info}", exc_info=True)
-        # Depending on the error, you might want to raise it or handle differently
+        logger.error(f"Failed to create or check index '{ELASTICSEARCH_INDEX}': {e.info}", exc_info=True)
         if 'resource_already_exists_exception' not in str(e): # Ignore if it already exists concurrently
              raise
     except Exception as e:
         logger.error(f"An unexpected error occurred during index check/creation: {e}", exc_info=True)
         raise
 
+# Filled in by the enricher after indexing; a fetched video does not carry them
+STATS_FIELDS = ("view_count", "like_count", "duration_seconds", "stats_updated_at")
+
+async def _put_added_mappings():
+    """Adds fields introduced after an index was created (topic, title.suggest, stats) to every index behind ELASTICSEARCH_INDEX."""
+    properties = VIDEO_MAPPINGS["properties"]
+    added = ["topic", "title", *STATS_FIELDS]
+    await get_es_client().indices.put_mapping(
+        index=ELASTICSEARCH_INDEX, properties={field: properties[field] for field in added}
+    )
+
+async def backfill_title_suggest():
+    """Starts an update_by_query that re-indexes documents written before title.suggest existed, so they get the sub-field.
+
+    Runs as a background task in Elasticsearch; documents written since already carry the field and are skipped.
+    """
+    client = get_es_client()
+    missing = {"bool": {"must_not": {"exists": {"field": "title.suggest"}}}}
+    try:
+        count = (await client.count(index=ELASTICSEARCH_INDEX, query=missing))['count']
+        if not count:
+            return
+        resp = await client.update_by_query(
+            index=ELASTICSEARCH_INDEX,
+            query=missing,
+            conflicts="proceed", # documents rewritten by the fetcher meanwhile already have the field
+            slices="auto",
+            wait_for_completion=False
+        )
+        logger.info(f"Backfilling title.suggest for {count} existing videos (task {resp['task']}).")
+    except Exception as e:
+        logger.error(f"Failed to start title.suggest backfill: {e}", exc_info=True)
+
+async def ensure_current_partition():
+    """Creates this period's partition ahead of its first write, so the read alias never resolves to nothing.
+
+    There is no write alias: every write targets the partition of the video's published_at directly.
+    """
+    client = get_es_client()
+    current = partition_index_name(datetime.now(timezone.utc))
+    try:
+        if not await client.indices.exists(index=current):
+            await client.indices.create(index=current)
+            logger.info(f"Partition '{current}' created.")
+    except RequestError as e:
+        if 'resource_already_exists_exception' not in str(e):
+            raise
+
+async def migrate_legacy_index():
+    """Moves a pre-partitioning concrete index into time partitions, then swaps it for the read alias.
+
+    Each period is reindexed with a published_at range query into its partition. The old index is removed
+    and the alias added in one atomic update, so readers switch over without seeing a gap. Safe to rerun
+    after an interruption: reindexing overwrites by video ID.
+    """
+    if not await _legacy_index_exists():
+        return
+    client = get_es_client()
+    resp = await client.search(
+        index=ELASTICSEARCH_INDEX,
+        size=0,
+        aggs={"oldest": {"min": {"field": "published_at"}}, "newest": {"max": {"field": "published_at"}}}
+    )
+    oldest, newest = resp['aggregations']['oldest']['value'], resp['aggregations']['newest']['value']
+    partitions = [partition_index_name(datetime.now(timezone.utc))]
+    if oldest is not None:
+        start = partition_bounds(partition_index_name(datetime.fromtimestamp(oldest / 1000, tz=timezone.utc)))[0]
+        newest_dt = datetime.fromtimestamp(newest / 1000, tz=timezone.utc)
+        while start <= newest_dt:
+            partitions.append(partition_index_name(start))
+            start = partition_bounds(partitions[-1])[1]
+
+    for partition in dict.fromkeys(partitions):
+        try:
+            # Created explicitly: the template cannot be installed yet, its alias name is still taken by the old index
+            await client.indices.create(index=partition, settings=PARTITION_SETTINGS, mappings=VIDEO_MAPPINGS)
+        except RequestError as e:
+            if 'resource_already_exists_exception' not in str(e):
+                raise
+        period_start, period_end = partition_bounds(partition)
+        logger.info(f"Reindexing '{ELASTICSEARCH_INDEX}' videos from {period_start.date()} into '{partition}'...")
+        await client.options(request_timeout=3600).reindex(
+            source={
+                "index": ELASTICSEARCH_INDEX,
+                "query": {"range": {"published_at": {"gte": period_start.isoformat(), "lt": period_end.isoformat()}}}
+            },
+            dest={"index": partition},
+            slices="auto",
+            wait_for_completion=True
+        )
+
+    try:
+        await client.indices.update_aliases(actions=[
+            {"add": {"index": PARTITION_PATTERN, "alias": ELASTICSEARCH_INDEX}},
+            {"remove_index": {"index": ELASTICSEARCH_INDEX}}
+        ])
+        logger.info(f"Legacy index '{ELASTICSEARCH_INDEX}' migrated into partitions and replaced by the read alias.")
+    except NotFoundError:
+        pass # another worker finished the swap first
+    await ensure_index_exists()
+
+async def drop_expired_partitions(retention_days: int) -> List[str]:
+    """Deletes whole partitions whose period ended more than `retention_days` ago. Returns their names."""
+    if retention_days <= 0:
+        return []
+    client = get_es_client()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    current = partition_index_name(datetime.now(timezone.utc))
+    try:
+        partitions = (await client.indices.get_alias(index=PARTITION_PATTERN, name=ELASTICSEARCH_INDEX)).keys()
+    except NotFoundError:
+        return []
+    expired = []
+    for index_name in sorted(partitions):
+        bounds = partition_bounds(index_name)
+        if index_name != current and bounds is not None and bounds[1] <= cutoff:
+            expired.append(index_name)
+    for index_name in expired:
+        try:
+            await client.indices.delete(index=index_name)
+            logger.info(f"Dropped partition '{index_name}' (older than {retention_days} days).")
+        except NotFoundError:
+            pass
+    return expired
+
+async def ensure_meta_index_exists():
+    """Creates the small index used for the fetcher lease and ingest generation if it doesn't exist."""
+    client = get_es_client()
+    try:
+        if not await client.indices.exists(index=ELASTICSEARCH_META_INDEX):
+            # dynamic: false keeps the free-form lease status out of the mapping; it is only read back from _source
+            await client.indices.create(
+                index=ELASTICSEARCH_META_INDEX,
+                mappings={
+                    "dynamic": False,
+                    "properties": {
+                        "holder": {"type": "keyword"},
+                        "expires_at": {"type": "date", "format": "epoch_millis"}
+                    }
+                }
+            )
+            logger.info(f"Index '{ELASTICSEARCH_META_INDEX}' created successfully.")
+    except RequestError as e:
+        if 'resource_already_exists_exception' not in str(e):
+            raise
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def acquire_lease(lease_id: str, holder: str, ttl_seconds: float, status: Optional[Dict[str, Any]] = None) -> bool:
+    """Takes or renews a lease document. Returns True if `holder` owns the lease afterwards.
+
+    Writes are conditional on the document's seq_no/primary_term, so of several processes racing for
+    an expired lease exactly one wins.
+    """
+    client = get_es_client()
+    now_ms = int(time.time() * 1000)
+    doc = {
+        "holder": holder,
+        "expires_at": now_ms + int(ttl_seconds * 1000),
+        "renewed_at": now_ms,
+        "status": status or {}
+    }
+    try:
+        current = await client.get(index=ELASTICSEARCH_META_INDEX, id=lease_id)
+    except NotFoundError:
+        try:
+            await client.create(index=ELASTICSEARCH_META_INDEX, id=lease_id, document=doc)
+            return True
+        except ConflictError:
+            return False
+
+    source = current['_source']
+    if source.get('holder') != holder and source.get('expires_at', 0) > now_ms:
+        return False
+    try:
+        await client.index(
+            index=ELASTICSEARCH_META_INDEX,
+            id=lease_id,
+            document=doc,
+            if_seq_no=current['_seq_no'],
+            if_primary_term=current['_primary_term']
+        )
+        return True
+    except ConflictError:
+        return False
+
+async def release_lease(lease_id: str, holder: str):
+    """Deletes the lease if `holder` still owns it, so another process can take over immediately."""
+    client = get_es_client()
+    try:
+        current = await client.get(index=ELASTICSEARCH_META_INDEX, id=lease_id)
+        if current['_source'].get('holder') == holder:
+            await client.delete(
+                index=ELASTICSEARCH_META_INDEX,
+                id=lease_id,
+                if_seq_no=current['_seq_no'],
+                if_primary_term=current['_primary_term']
+            )
+    except (NotFoundError, ConflictError):
+        pass
+    except Exception as e:
+        logger.error(f"Failed to release lease '{lease_id}': {e}", exc_info=True)
+
+async def get_lease(lease_id: str) -> Optional[Dict[str, Any]]:
+    """Returns the lease document (holder, expires_at, status), or None if nobody holds it."""
+    client = get_es_client()
+    try:
+        return (await client.get(index=ELASTICSEARCH_META_INDEX, id=lease_id))['_source']
+    except NotFoundError:
+        return None
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def publish_ingest_generation():
+    """Records that new videos were indexed; API processes poll this to invalidate their caches."""
+    client = get_es_client()
+    try:
+        await client.index(
+            index=ELASTICSEARCH_META_INDEX,
+            id="ingest",
+            document={"generation": time.time_ns()}
+        )
+    except Exception as e:
+        logger.error(f"Failed to publish ingest generation: {e}", exc_info=True)
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def get_ingest_generation() -> Optional[int]:
+    client = get_es_client()
+    try:
+        resp = await client.get(index=ELASTICSEARCH_META_INDEX, id="ingest")
+        return resp['_source'].get('generation')
+    except NotFoundError:
+        return None
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
 async def index_video(video: Video):
     """Indexes or updates a single video document in Elasticsearch."""
     client = get_es_client()
-    index_name = ELASTICSEARCH_INDEX
+    index_name = partition_index_name(video.published_at)
     try:
         # Use video_id as the document ID for automatic updates (upsert)
         await client.index(
@@ -74,8 +389,181 @@ async def index_video(video: Video):
     except Exception as e:
         logger.error(f"Failed to index video ID {video.video_id}: {e}", exc_info=True)
 
-async def get_latest_video_timestamp() -> Optional[datetime]:
-    """Fetches the 'published_at' timestamp of the most recent video in the index."""
+def _is_permanent_failure(status: Any) -> bool:
+    """True for per-document errors retrying cannot fix (4xx such as mapper_parsing_exception). Timeouts, 429
+    (es_rejected_execution_exception) and 5xx are transient, as are transport errors, which carry no status."""
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def bulk_index_videos(
+    videos: List[Video],
+    chunk_size: int = ES_BULK_CHUNK_SIZE,
+    refresh: Union[bool, str] = ES_BULK_REFRESH
+) -> BulkIndexResult:
+    """Indexes or updates a batch of videos via the bulk API, reporting the outcome per document."""
+    client = get_es_client()
+    result = BulkIndexResult()
+    if not videos:
+        return result
+
+    # Upserts rather than replaces, leaving out stats the fetch did not carry, so re-fetching an enriched
+    # video (a backfill rerun, a journal replay) keeps its view/like counts and duration.
+    # Each video goes to the partition of its published_at, so an ID lives in exactly
+    # one partition however late it is fetched; missing partitions are created from the template
+    actions = (
+        {
+            "_op_type": "update",
+            "_index": partition_index_name(video.published_at),
+            "_id": video.video_id,
+            "doc": video.model_dump(mode='json', exclude={field for field in STATS_FIELDS if getattr(video, field) is None}),
+            "doc_as_upsert": True
+        }
+        for video in videos
+    )
+
+    try:
+        async for ok, item in async_streaming_bulk(
+            client,
+            actions,
+            chunk_size=chunk_size,
+            refresh=refresh,
+            raise_on_error=False, # Collect per-document failures instead of raising on the first one
+            raise_on_exception=False,
+            max_retries=2 # Retries documents rejected with 429 (bulk queue full)
+        ):
+            info = item.get("update", {})
+            video_id = info.get("_id")
+            if ok:
+                result.indexed.append(video_id)
+                if info.get("result") == "created":
+                    result.created.append(video_id)
+            else:
+                result.failed[video_id] = str(info.get("error", "unknown error"))
+                if _is_permanent_failure(info.get("status")):
+                    result.rejected.append(video_id)
+    except Exception as e:
+        # Anything not already reported per document failed as a whole (transient: the request itself failed)
+        logger.error(f"Bulk indexing of {len(videos)} videos failed: {e}", exc_info=True)
+        done = set(result.indexed) | set(result.failed)
+        for video in videos:
+            if video.video_id not in done:
+                result.failed[video.video_id] = str(e)
+
+    if result.failed:
+        logger.warning(f"Bulk indexing failed for {len(result.failed)}/{len(videos)} videos: {list(result.failed.items())[:5]}")
+    return result
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def update_video_stats(updates: List[Tuple[str, VideoStats]]) -> BulkIndexResult:
+    """Partially updates statistics fields of existing videos. `updates` pairs each stats object with the
+    concrete partition holding the video (updates cannot go through the multi-index read alias)."""
+    client = get_es_client()
+    result = BulkIndexResult()
+    if not updates:
+        return result
+    actions = (
+        {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": stats.video_id,
+            "doc": stats.model_dump(mode='json', exclude={"video_id"})
+        }
+        for index_name, stats in updates
+    )
+    try:
+        async for ok, item in async_streaming_bulk(
+            client, actions, chunk_size=ES_BULK_CHUNK_SIZE, raise_on_error=False, raise_on_exception=False
+        ):
+            info = item.get("update", {})
+            if ok:
+                result.indexed.append(info.get("_id"))
+            else:
+                result.failed[info.get("_id")] = str(info.get("error", "unknown error"))
+    except Exception as e:
+        logger.error(f"Bulk stats update of {len(updates)} videos failed: {e}", exc_info=True)
+        done = set(result.indexed) | set(result.failed)
+        for _, stats in updates:
+            if stats.video_id not in done:
+                result.failed[stats.video_id] = str(e)
+    if result.failed:
+        logger.warning(f"Stats update failed for {len(result.failed)}/{len(updates)} videos: {list(result.failed.items())[:5]}")
+    return result
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def get_videos_needing_stats(published_after: datetime, stale_before: datetime, limit: int) -> List[Tuple[str, str]]:
+    """Returns (video_id, concrete index) of videos published after `published_after` whose statistics are
+    missing or older than `stale_before`, newest first."""
+    client = get_es_client()
+    try:
+        resp = await client.search(
+            index=ELASTICSEARCH_INDEX,
+            query={
+                "bool": {
+                    "filter": [{"range": {"published_at": {"gte": published_after.isoformat()}}}],
+                    "should": [
+                        {"bool": {"must_not": {"exists": {"field": "stats_updated_at"}}}},
+                        {"range": {"stats_updated_at": {"lt": stale_before.isoformat()}}}
+                    ],
+                    "minimum_should_match": 1
+                }
+            },
+            sort=[{"published_at": "desc"}],
+            size=limit,
+            _source=False,
+            track_total_hits=False
+        )
+        return [(hit['_id'], hit['_index']) for hit in resp['hits']['hits']]
+    except NotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"Error fetching videos needing stats: {e}", exc_info=True)
+        return []
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def get_existing_video_ids(video_ids: List[str]) -> Set[str]:
+    """Returns the subset of the given video IDs that are already indexed."""
+    client = get_es_client()
+    index_name = ELASTICSEARCH_INDEX
+    if not video_ids:
+        return set()
+    try:
+        resp = await client.search(
+            index=index_name,
+            query={"ids": {"values": video_ids}},
+            size=len(video_ids),
+            _source=False,
+            track_total_hits=False
+        )
+        return {hit['_id'] for hit in resp['hits']['hits']}
+    except NotFoundError:
+        return set()
+    except Exception as e:
+        logger.error(f"Error checking existing video IDs: {e}", exc_info=True)
+        return set()
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def get_recent_video_ids(limit: int) -> List[str]:
+    """Returns the IDs of the `limit` most recently published videos, newest first."""
+    client = get_es_client()
+    index_name = ELASTICSEARCH_INDEX
+    try:
+        resp = await client.search(
+            index=index_name,
+            size=limit,
+            sort=[{"published_at": "desc"}],
+            _source=False,
+            track_total_hits=False
+        )
+        return [hit['_id'] for hit in resp['hits']['hits']]
+    except NotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"Error fetching recent video IDs: {e}", exc_info=True)
+        return []
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def get_latest_video_timestamp(topic: Optional[str] = None) -> Optional[datetime]:
+    """Fetches the 'published_at' timestamp of the most recent video in the index, optionally for one topic."""
     client = get_es_client() # Assumes get_es_client() is available
     index_name = ELASTICSEARCH_INDEX
     try:
@@ -87,6 +575,7 @@ async def get_latest_video_timestamp() -> Optional[datetime]:
         resp = await client.search(
             index=index_name,
             size=1,
+            query={"term": {"topic": topic}} if topic else None,
             sort=[{"published_at": "desc"}],
             _source=["published_at"] # Only fetch the required field
         )
@@ -121,7 +610,7 @@ async def get_latest_video_timestamp() -> Optional[datetime]:
                  logger.error(f"Unexpected error parsing timestamp '{timestamp_str}': {e}", exc_info=True)
                  return None
         else:
-            logger.info(f"No videos found in index '{index_name}'. Returning None for timestamp.")
+            logger.info(f"No videos found in index '{index_name}' (topic={topic!r}). Returning None for timestamp.")
             return None
     except NotFoundError:
          logger.warning(f"Index '{index_name}' not found when querying for latest timestamp.")
@@ -130,39 +619,79 @@ async def get_latest_video_timestamp() -> Optional[datetime]:
         logger.error(f"Error fetching latest video timestamp: {e}", exc_info=True)
         return None # Don't block fetching if this fails
 
-async def get_videos_paginated(page: int, size: int) -> Tuple[List[Video], int]:
-    """Retrieves stored videos, sorted by published_at descending, with pagination."""
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def get_videos_paginated(
+    page: int,
+    size: int,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int], int, Optional[str]]:
+    """Retrieves stored videos, sorted by published_at descending, with pagination.
+
+    Shallow pages use from/size; a cursor switches to search_after on (published_at, video_id), which
+    costs the same at any depth. Totals are exact in page mode and, when requested, a lower bound capped
+    at VIDEOS_APPROX_TOTAL_LIMIT in cursor mode. Returns (video documents, total, page, next_cursor).
+    """
     client = get_es_client()
     index_name = ELASTICSEARCH_INDEX
     if page < 1: page = 1
-    from_ = (page - 1) * size
+
+    search_after = None
+    if cursor:
+        state = decode_cursor(cursor)
+        search_after = state.get("after")
+        if state.get("k") != "videos" or not isinstance(search_after, list) or len(search_after) != 2:
+            raise InvalidCursorError("Cursor does not belong to /videos.")
+        page = state.get("page", page)
+        track_total_hits: Union[bool, int] = VIDEOS_APPROX_TOTAL_LIMIT if include_total else False
+    else:
+        track_total_hits = include_total is not False # Ensure total count is accurate
 
     try:
         resp = await client.search(
             index=index_name,
-            size=size,
-            from_=from_,
-            sort=[{"published_at": "desc"}],
-            track_total_hits=True # Ensure total count is accurate
+            size=size + 1, # one extra hit tells us whether another page exists
+            from_=None if cursor else (page - 1) * size,
+            search_after=search_after,
+            sort=[{"published_at": "desc"}, {"video_id": "desc"}],
+            track_total_hits=track_total_hits
         )
-        total_hits = resp['hits']['total']['value']
-        videos = [Video.model_validate(hit['_source']) for hit in resp['hits']['hits']]
-        return videos, total_hits
+        total_hits = resp['hits']['total']['value'] if track_total_hits else None
+        hits = resp['hits']['hits']
+        # _source was validated by the Video model on the write side, so it is passed through as is
+        videos = [hit['_source'] for hit in hits[:size]]
+        next_cursor = None
+        if len(hits) > size:
+            next_cursor = encode_cursor({"k": "videos", "after": hits[size - 1]['sort'], "page": page + 1})
+        return videos, total_hits, page, next_cursor
     except NotFoundError:
         logger.warning(f"Index '{index_name}' not found during paginated fetch.")
-        return [], 0
+        return [], 0, page, None
     except Exception as e:
         logger.error(f"Error fetching paginated videos: {e}", exc_info=True)
-        return [], 0 # Return empty on error
+        return [], 0, page, None # Return empty on error
 
-async def search_videos(query: str) -> Tuple[List[Video], int]:
-    """Searches videos by title and description using a multi_match query, ignoring pagination."""
+async def _close_pit(pit_id: str):
+    try:
+        await get_es_client().close_point_in_time(id=pit_id)
+    except Exception as e:
+        logger.debug(f"Failed to close search point-in-time: {e}")
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def search_videos(
+    query: str,
+    size: int,
+    cursor: Optional[str] = None,
+    track_total: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[int], int, Optional[str]]:
+    """Searches videos by title and description using a multi_match query, one page at a time.
+
+    Pages are read with search_after over a point-in-time, so every page costs the same no matter how deep
+    it is. Returns (video documents, total, page, next_cursor); total is None unless `track_total` is set.
+    """
     client = get_es_client()
     index_name = ELASTICSEARCH_INDEX
 
-    # Set a large size to get all the results
-    size = 10000  # You can adjust this as needed (max size Elasticsearch can return in a single request)
-    
     search_query = {
         "multi_match": {
             "query": query,
@@ -172,22 +701,139 @@ async def search_videos(query: str) -> Tuple[List[Video], int]:
         }
     }
 
+    page = 1
+    search_after = None
+    if cursor:
+        state = decode_cursor(cursor)
+        if normalize_query(str(state.get("q"))) != normalize_query(query) or "pit" not in state:
+            raise InvalidCursorError("Cursor does not belong to this search query.")
+        pit_id, search_after, page = state["pit"], state.get("after"), state.get("page", 1)
+    else:
+        try:
+            pit_id = (await client.open_point_in_time(index=index_name, keep_alive=SEARCH_PIT_KEEP_ALIVE))['id']
+        except NotFoundError:
+            logger.warning(f"Index '{index_name}' not found during search.")
+            return [], 0 if track_total else None, 1, None
+        # Anything else propagates: an empty page would look like "no matches" to the client
+
     try:
         resp = await client.search(
-            index=index_name,
             query=search_query,
-            size=size,
-            track_total_hits=True  # Tracks the total number of hits
+            pit={"id": pit_id, "keep_alive": SEARCH_PIT_KEEP_ALIVE},
+            sort=[{"_score": "desc"}], # the PIT adds an implicit _shard_doc tiebreaker
+            search_after=search_after,
+            size=size + 1, # one extra hit tells us whether another page exists
+            track_total_hits=track_total
         )
+    except NotFoundError as e:
+        if cursor:
+            raise InvalidCursorError("Cursor has expired. Restart the search from the first page.") from e
+        logger.warning(f"Index '{index_name}' not found during search.")
+        await _close_pit(pit_id)
+        return [], 0 if track_total else None, page, None
+    except Exception:
+        if not cursor:
+            await _close_pit(pit_id)
+        raise
 
-        # Extract total hits and videos
-        total_hits = resp['hits']['total']['value']
-        videos = [Video.model_validate(hit['_source']) for hit in resp['hits']['hits']]
-        return videos, total_hits
+    hits = resp['hits']['hits']
+    total_hits = resp['hits']['total']['value'] if track_total else None
+    videos = [hit['_source'] for hit in hits[:size]]
 
+    next_cursor = None
+    if len(hits) > size:
+        next_cursor = encode_cursor({
+            "q": normalize_query(query),
+            "pit": resp.get('pit_id', pit_id),
+            "after": hits[size - 1]['sort'],
+            "page": page + 1
+        })
+    if next_cursor is None and not cursor:
+        # A single-page search hands out no cursor, so nothing else can use its point-in-time
+        await _close_pit(resp.get('pit_id', pit_id))
+    # Once a cursor is out the point-in-time is left to expire via keep_alive rather than closed on the
+    # last page: cached pages hand the same cursor chain to many clients.
+    return videos, total_hits, page, next_cursor
+
+@metrics.timed(metrics.ES_REQUEST_SECONDS)
+async def suggest_titles(prefix: str, size: int) -> List[Dict[str, Any]]:
+    """Returns up to `size` {video_id, title} matches for a type-ahead prefix, best first.
+
+    A bool_prefix multi_match over the title.suggest shingle fields treats the last term as a prefix and
+    the others as whole terms, without fuzziness, totals or full documents.
+    """
+    client = get_es_client()
+    try:
+        resp = await client.search(
+            index=ELASTICSEARCH_INDEX,
+            query={
+                "multi_match": {
+                    "query": prefix,
+                    "type": "bool_prefix",
+                    "fields": ["title.suggest", "title.suggest._2gram", "title.suggest._3gram"]
+                }
+            },
+            size=size,
+            _source=["video_id", "title"],
+            track_total_hits=False,
+            timeout=SUGGEST_TIMEOUT # partial results beat a slow answer for type-ahead
+        )
     except NotFoundError:
-        logger.warning(f"Index '{index_name}' not found during search.")
-        return [], 0
+        return []
     except Exception as e:
-        logger.error(f"Error searching videos for query '{query}': {e}", exc_info=True)
-        return [], 0  # Return empty on error
+        logger.error(f"Error fetching suggestions for prefix '{prefix}': {e}", exc_info=True)
+        return []
+    return [hit['_source'] for hit in resp['hits']['hits']]
+
+async def iter_video_documents(
+    published_after: Optional[datetime] = None,
+    published_before: Optional[datetime] = None,
+    fields: Optional[List[str]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yields every stored video document in batches, walking a point-in-time with search_after.
+
+    Only one batch is held in memory at a time, whatever the size of the index. Documents come in
+    index order (_shard_doc), the cheapest sort for a full scan.
+    """
+    client = get_es_client()
+    index_name = ELASTICSEARCH_INDEX
+
+    date_range: Dict[str, str] = {}
+    if published_after:
+        date_range["gte"] = published_after.isoformat()
+    if published_before:
+        date_range["lt"] = published_before.isoformat()
+    query = {"range": {"published_at": date_range}} if date_range else {"match_all": {}}
+
+    try:
+        pit_id = (await client.open_point_in_time(index=index_name, keep_alive=SEARCH_PIT_KEEP_ALIVE))['id']
+    except NotFoundError:
+        logger.warning(f"Index '{index_name}' not found during export.")
+        return
+
+    search_after = None
+    try:
+        while True:
+            resp = await client.search(
+                query=query,
+                pit={"id": pit_id, "keep_alive": SEARCH_PIT_KEEP_ALIVE},
+                sort=["_shard_doc"],
+                search_after=search_after,
+                size=batch_size,
+                source_includes=fields,
+                track_total_hits=False
+            )
+            pit_id = resp.get('pit_id', pit_id)
+            hits = resp['hits']['hits']
+            if not hits:
+                return
+            yield [hit['_source'] for hit in hits]
+            if len(hits) < batch_size:
+                return
+            search_after = hits[-1]['sort']
+    finally:
+        try:
+            await client.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.debug(f"Failed to close export point-in-time: {e}")
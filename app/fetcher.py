@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from .config import FETCH_CONCURRENCY, FETCH_INTERVAL_SECONDS, SEARCH_QUERIES
+from . import es_utils
+from . import yt_utils
+from . import state_utils
+from . import write_queue
+from . import enrichment
+from . import metrics
+from .poll_scheduler import AdaptivePollScheduler
+from .pydantic_models import TopicProgress
+
+logger = logging.getLogger(__name__)
+
+shutdown_event = asyncio.Event()
+poll_scheduler = AdaptivePollScheduler(SEARCH_QUERIES)
+
+def _walk_progress(
+    watermark: Optional[datetime],
+    resume: Optional[Tuple[datetime, datetime]],
+    newest: Optional[datetime],
+    oldest: Optional[datetime],
+    finished: bool
+) -> Optional[TopicProgress]:
+    """Where the topic stands after a walk over [watermark, resume point or now]. None if nothing changed."""
+    if finished or watermark is None:
+        # The whole range was fetched; a topic's very first walk only sets its starting point (history is backfill's job)
+        candidates = [ts for ts in (newest, resume[1] if resume else None) if ts is not None]
+        return TopicProgress(watermark=max(candidates)) if candidates else None
+    if oldest is None:
+        return None # nothing fetched, so any earlier resume point still stands
+    return TopicProgress(
+        # Inclusive of the oldest video's second, so videos sharing it are not skipped; repeats are dropped as known
+        resume_before=oldest + timedelta(seconds=1),
+        resume_newest=max(newest, resume[1]) if resume else newest
+    )
+
+async def fetch_topic(topic: str, semaphore: asyncio.Semaphore) -> Optional[int]:
+    """Walks the topic's result pages above its watermark, newest first, handing each page's new videos to the write-behind queue.
+
+    The watermark only moves once a walk reaches its last page. A walk cut short by the page budget, a failed
+    page or lack of quota leaves a resume point, and the next poll walks [watermark, oldest video fetched]
+    before anything newer. Returns the number of new videos, or None if no API key was available. Raises
+    if the walk failed before fetching anything, so the failure is not mistaken for a quiet topic.
+    """
+    async with semaphore:
+        latest_timestamp = await state_utils.get_watermark(topic)
+        resume = state_utils.topic_resume.get(topic) if latest_timestamp is not None else None
+
+        if yt_utils.key_scheduler.total_remaining() < yt_utils.SEARCH_LIST_COST:
+            logger.error(f"No YouTube API key available. Skipping topic '{topic}' this cycle.")
+            return None
+
+        fetched_count = 0
+        queued_count = 0
+        skipped_count = 0
+        newest: Optional[datetime] = None
+        oldest: Optional[datetime] = None
+        finished = False
+        walk_error: Optional[Exception] = None
+        try:
+            async with aclosing(yt_utils.iter_video_pages(
+                search_query=topic,
+                published_after=latest_timestamp,
+                published_before=resume[0] if resume else None
+            )) as pages:
+                async for page, next_page_token in pages:
+                    finished = next_page_token is None
+                    fetched_count += len(page)
+                    if page:
+                        page_newest = max(video.published_at for video in page)
+                        page_oldest = min(video.published_at for video in page)
+                        newest = page_newest if newest is None else max(newest, page_newest)
+                        oldest = page_oldest if oldest is None else min(oldest, page_oldest)
+                    # Known IDs (indexed, or still waiting in the write queue) are dropped in process; only the rest
+                    # cost an ES existence check. They may belong to an overlapping topic, so the walk goes on.
+                    unseen, seen = state_utils.seen_ids.split(page)
+                    queued = [video for video in unseen if video.video_id in write_queue.writer.pending_ids]
+                    unseen = [video for video in unseen if video.video_id not in write_queue.writer.pending_ids]
+                    existing_ids = await es_utils.get_existing_video_ids([video.video_id for video in unseen])
+                    state_utils.seen_ids.add(existing_ids)
+                    new_videos = [video for video in unseen if video.video_id not in existing_ids]
+                    known_count = len(seen) + len(queued) + len(existing_ids)
+                    skipped_count += known_count
+                    metrics.inc(metrics.VIDEOS_FETCHED, len(page), topic)
+                    metrics.inc(metrics.VIDEOS_SKIPPED, known_count, topic)
+                    if new_videos:
+                        await write_queue.writer.submit(topic, new_videos)
+                        queued_count += len(new_videos)
+        except yt_utils.YouTubeFetchError as fetch_err:
+            logger.warning(f"Page walk for topic '{topic}' stopped at a failed page ({fetch_err}). It resumes next poll.")
+            finished, walk_error = False, fetch_err
+        except Exception as fetch_err:
+            logger.error(f"Error while fetching pages for topic '{topic}': {fetch_err}", exc_info=True)
+            finished, walk_error = False, fetch_err
+
+        progress = _walk_progress(latest_timestamp, resume, newest, oldest, finished)
+        if progress is not None:
+            # Queued behind this walk's batches, so it is recorded only once they are durable
+            await write_queue.writer.submit(topic, [], progress=progress)
+        if progress is not None and progress.resume_before is not None:
+            logger.info(f"Walk for topic '{topic}' was cut short; videos before {progress.resume_before.isoformat()} are fetched next poll.")
+
+        if walk_error is not None and not fetched_count:
+            raise walk_error
+        if fetched_count:
+            logger.info(f"Queued {queued_count}/{fetched_count} fetched videos for indexing for topic '{topic}' ({skipped_count} already indexed, skipped).")
+        else:
+            logger.info(f"No new videos fetched for topic '{topic}' in this cycle.")
+        return queued_count
+
+
+async def periodic_fetch():
+    """Background task that polls each configured topic when the adaptive scheduler says it is due."""
+    logger.info(f"Starting periodic YouTube video fetch task for {len(SEARCH_QUERIES)} topic(s)...")
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    write_queue.writer.start()
+    enrichment.enricher.start()
+    try:
+        await _poll_until_shutdown(semaphore)
+    finally:
+        # Whatever the writer has not indexed yet goes to the journal, to be replayed by the next leader
+        await write_queue.writer.stop()
+        await enrichment.enricher.stop()
+    logger.info("Periodic YouTube video fetch task stopped.")
+
+
+async def _poll_until_shutdown(semaphore: asyncio.Semaphore):
+    while not shutdown_event.is_set():
+        try:
+            due_topics = poll_scheduler.due_topics()
+            if due_topics:
+                logger.info(f"Running fetch cycle for {len(due_topics)} due topic(s)...")
+                # Watermarks before the walk: the window a topic's first poll is measured over
+                since = {topic: await state_utils.get_watermark(topic) for topic in due_topics}
+                results = await asyncio.gather(
+                    *(fetch_topic(topic, semaphore) for topic in due_topics),
+                    return_exceptions=True
+                )
+                for topic, result in zip(due_topics, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"Error fetching topic '{topic}': {result}", exc_info=result)
+                        poll_scheduler.record_failure(topic)
+                    elif result is None:
+                        logger.error(f"No YouTube API key available for topic '{topic}'. Backing off.")
+                        poll_scheduler.postpone(topic, FETCH_INTERVAL_SECONDS * 5)
+                    else:
+                        poll_scheduler.record_poll(topic, result, since=since[topic])
+
+            try:
+                 await asyncio.wait_for(shutdown_event.wait(), timeout=poll_scheduler.seconds_until_next())
+            except asyncio.TimeoutError:
+                 pass
+
+        except Exception as e:
+            logger.error(f"Error in periodic_fetch loop: {e}", exc_info=True)
+            await asyncio.sleep(FETCH_INTERVAL_SECONDS)
+
+
+def status_snapshot() -> Dict[str, Any]:
+    """Fetcher state published with the leader lease, so API processes can report it."""
+    return {
+        "api_keys": [state.model_dump(mode='json') for state in yt_utils.key_scheduler.states()],
+        "topics": [state.model_dump() for state in poll_scheduler.states()],
+        "watermarks": {topic: ts.isoformat() for topic, ts in state_utils.topic_watermarks.items()},
+        "resume": {topic: before.isoformat() for topic, (before, _) in state_utils.topic_resume.items()},
+        "seen_ids": {"size": len(state_utils.seen_ids), "dropped": state_utils.seen_ids.dropped},
+        "write_queue": write_queue.writer.stats(),
+        "enrichment": enrichment.enricher.stats()
+    }
@@ -0,0 +1,111 @@
+import bisect
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import ELASTICSEARCH_INDEX, HOT_TIER_SIZE
+from .pydantic_models import Video
+from . import es_utils
+
+logger = logging.getLogger(__name__)
+
+
+def _sort_key(doc: Dict[str, Any]) -> Tuple[int, str]:
+    # Same values Elasticsearch returns for the /videos sort: epoch millis of published_at, then video_id
+    published_at = datetime.fromisoformat(doc['published_at'].replace('Z', '+00:00'))
+    return int(published_at.timestamp() * 1000), doc['video_id']
+
+
+class HotTier:
+    """Bounded, sorted in-memory copy of the newest video documents in the index, used to answer first /videos pages."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # Ascending by (published_at, video_id); the newest video is last
+        self._keys: List[Tuple[int, str]] = []
+        self._videos: List[Dict[str, Any]] = [] # documents exactly as stored in _source
+        self._by_id: Dict[str, Tuple[int, str]] = {}
+        self.total: Optional[int] = None # documents in the index; None until warmed
+
+    @property
+    def warmed(self) -> bool:
+        return self.total is not None
+
+    def __len__(self) -> int:
+        return len(self._videos)
+
+    def _complete(self) -> bool:
+        """True when the ring holds every document in the index."""
+        return self.total is not None and len(self._videos) >= self.total
+
+    async def warm(self):
+        """Loads the newest `capacity` videos and the exact index total from Elasticsearch."""
+        if self.capacity <= 0:
+            return
+        # Queried directly (not via get_videos_paginated) so a failure is raised instead of warming an empty ring
+        resp = await es_utils.get_es_client().search(
+            index=ELASTICSEARCH_INDEX,
+            size=self.capacity,
+            sort=[{"published_at": "desc"}, {"video_id": "desc"}],
+            track_total_hits=True
+        )
+        total = resp['hits']['total']['value']
+        self._keys.clear()
+        self._videos.clear()
+        self._by_id.clear()
+        for hit in resp['hits']['hits']:
+            self._insert(hit['_source'])
+        self.total = total
+        logger.info(f"Hot tier warmed with {len(self._videos)} of {total} videos.")
+
+    def _insert(self, doc: Dict[str, Any]):
+        key = _sort_key(doc)
+        old_key = self._by_id.get(doc['video_id'])
+        if old_key is not None:
+            pos = bisect.bisect_left(self._keys, old_key)
+            del self._keys[pos]
+            del self._videos[pos]
+        pos = bisect.bisect_left(self._keys, key)
+        self._keys.insert(pos, key)
+        self._videos.insert(pos, doc)
+        self._by_id[doc['video_id']] = key
+
+    def add(self, videos: List[Video], created_count: int):
+        """Feeds freshly indexed videos into the ring; `created_count` of them were new documents."""
+        if not self.warmed:
+            return
+        # Checked before counting the new documents: a ring holding the whole index keeps holding it
+        complete = self._complete()
+        self.total += created_count
+        for video in videos:
+            doc = video.model_dump(mode='json') # same document bulk_index_videos wrote
+            # Only videos at least as new as the oldest held one keep the ring an exact prefix of the index
+            if (
+                video.video_id in self._by_id
+                or len(self._videos) < self.capacity and complete
+                or not self._keys or _sort_key(doc) > self._keys[0]
+            ):
+                self._insert(doc)
+        while len(self._videos) > self.capacity:
+            old_key = self._keys.pop(0)
+            self._videos.pop(0)
+            del self._by_id[old_key[1]]
+
+    def page(self, page: int, size: int) -> Optional[Tuple[List[Dict[str, Any]], int, Optional[str]]]:
+        """Returns (videos, total, next_cursor) for a newest-first page, or None if it lies outside the ring."""
+        if not self.warmed:
+            return None
+        end = page * size
+        if end > len(self._videos) and not self._complete():
+            return None
+        count = len(self._videos)
+        start_idx = max(count - end, 0)
+        stop_idx = max(count - (page - 1) * size, 0)
+        videos = self._videos[start_idx:stop_idx][::-1]
+        next_cursor = None
+        if videos and end < self.total:
+            next_cursor = es_utils.encode_cursor({"k": "videos", "after": list(_sort_key(videos[-1])), "page": page + 1})
+        return videos, self.total, next_cursor
+
+
+feed = HotTier(HOT_TIER_SIZE)
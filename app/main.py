@@ -1,73 +1,55 @@
 import logging
 import asyncio
-from contextlib import asynccontextmanager
+import zlib
+from contextlib import aclosing, asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, Query, HTTPException
+import orjson
+from fastapi import FastAPI, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
-from .config import DEFAULT_PAGE_SIZE,FETCH_INTERVAL_SECONDS,MAX_PAGE_SIZE,SEARCH_QUERY
-from .pydantic_models import VideoListResponse
+from .config import (
+    DEFAULT_PAGE_SIZE, ES_MAX_RESULT_WINDOW, FETCHER_LEASE_TTL_SECONDS, INGEST_WATCH_INTERVAL_SECONDS,
+    MAX_PAGE_SIZE, METRICS_ENABLED, RUN_FETCHER_IN_API, SUGGEST_DEFAULT_SIZE, SUGGEST_MAX_SIZE
+)
+from .pydantic_models import SuggestResponse, Video, VideoListResponse
 from . import es_utils
 from . import yt_utils
+from . import cache_utils
+from . import hot_tier
+from . import worker
+from . import metrics
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-background_task = None
+background_tasks: List[asyncio.Task] = []
 shutdown_event = asyncio.Event()
 
-async def periodic_fetch():
-    """Background task to periodically fetch videos from YouTube."""
-    logger.info("Starting periodic YouTube video fetch task...")
+async def watch_ingest_generation():
+    """Drops cached searches and re-warms the hot tier whenever the fetcher reports newly indexed videos."""
+    last_generation = None
     while not shutdown_event.is_set():
         try:
-            logger.info("Running fetch cycle...")
-            latest_timestamp = await es_utils.get_latest_video_timestamp()
-
-            api_key = yt_utils.get_next_api_key()
-            if not api_key:
-                logger.error("No YouTube API key available. Skipping fetch cycle.")
-                await asyncio.sleep(FETCH_INTERVAL_SECONDS * 5)
-                continue
-
-            try:
-                new_videos = await yt_utils.fetch_latest_videos(
-                    search_query=SEARCH_QUERY,
-                    api_key=api_key,
-                    published_after=latest_timestamp
-                )
-            except Exception as fetch_err:
-                 logger.error(f"Error during yt_utils.fetch_latest_videos: {fetch_err}", exc_info=True)
-                 new_videos = []
-
-            if new_videos:
-                logger.info(f"Fetched {len(new_videos)} new videos. Indexing...")
-                indexed_count = 0
-                for video in new_videos:
-                    try:
-                        await es_utils.index_video(video)
-                        indexed_count += 1
-                    except Exception as index_err:
-                        logger.error(f"Failed to index video {video.video_id}: {index_err}", exc_info=True)
-                        
-                logger.info(f"Successfully indexed {indexed_count}/{len(new_videos)} videos.")
-            else:
-                logger.info("No new videos fetched in this cycle.")
-
-            try:
-                 await asyncio.wait_for(shutdown_event.wait(), timeout=FETCH_INTERVAL_SECONDS)
-            except asyncio.TimeoutError:
-                 pass
-
+            generation = await es_utils.get_ingest_generation()
+            if generation != last_generation:
+                if last_generation is not None:
+                    cache_utils.bump_generation()
+                    await hot_tier.feed.warm()
+                last_generation = generation
+            elif not hot_tier.feed.warmed:
+                await hot_tier.feed.warm()
         except Exception as e:
-            logger.error(f"Error in periodic_fetch loop: {e}", exc_info=True)
-            await asyncio.sleep(FETCH_INTERVAL_SECONDS)
-
-    logger.info("Periodic YouTube video fetch task stopped.")
+            logger.error(f"Error while checking ingest generation: {e}", exc_info=True)
+        try:
+            await asyncio.wait_for(shutdown_event.wait(), timeout=INGEST_WATCH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles application startup and shutdown events."""
-    global background_task
     logger.info("Application startup...")
 
     # initialize ES
@@ -77,16 +59,24 @@ async def lifespan(app: FastAPI):
              raise ConnectionError("Elasticsearch connection failed!")
         logger.info("Elasticsearch connection successful.")
         await es_utils.ensure_index_exists()
+        await es_utils.ensure_meta_index_exists()
     except Exception as e:
          logger.critical(f"Failed to connect to Elasticsearch or ensure index exists: {e}", exc_info=True)
          raise RuntimeError(f"Elasticsearch setup failed: {e}") from e
 
+    # Newest videos served from memory for the first /videos pages
+    try:
+        await hot_tier.feed.warm()
+    except Exception as e:
+        logger.error(f"Failed to warm hot tier; /videos will read from Elasticsearch: {e}", exc_info=True)
 
-    # Start the background task
+    # Start the background tasks; the API itself only reads, fetching runs in `python -m app.worker`
     shutdown_event.clear()
-    loop = asyncio.get_running_loop()
-    background_task = loop.create_task(periodic_fetch())
-    logger.info("Background fetch task created.")
+    background_tasks.append(asyncio.create_task(watch_ingest_generation()))
+    if RUN_FETCHER_IN_API:
+        yt_utils.get_http_client()
+        background_tasks.append(asyncio.create_task(worker.run_leader_loop(shutdown_event)))
+        logger.info("Embedded fetcher started (RUN_FETCHER_IN_API).")
 
     yield
 
@@ -94,18 +84,21 @@ async def lifespan(app: FastAPI):
     logger.info("Application shutdown...")
 
     shutdown_event.set()
-    if background_task:
+    for task in background_tasks:
         try:
-            await asyncio.wait_for(background_task, timeout=FETCH_INTERVAL_SECONDS + 5)
-            logger.info("Background task finished.")
+            await asyncio.wait_for(task, timeout=FETCHER_LEASE_TTL_SECONDS + 5)
         except asyncio.TimeoutError:
             logger.warning("Background task did not finish in time. Cancelling.")
-            background_task.cancel()
+            task.cancel()
         except Exception as e:
              logger.error(f"Error during background task shutdown: {e}", exc_info=True)
+    background_tasks.clear()
+    logger.info("Background tasks finished.")
 
-    # Close Elasticsearch client
+    # Close YouTube HTTP client and Elasticsearch client
+    await yt_utils.close_http_client()
     await es_utils.close_es_client()
+    metrics.mark_process_dead()
     logger.info("Application shutdown complete.")
 
 
@@ -116,64 +109,185 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+if METRICS_ENABLED:
+    app.add_middleware(metrics.RequestTimingMiddleware)
 
 # API Endpoints
 
+def video_list_response(
+    videos: List[Dict[str, Any]], total: Optional[int], page: int, next_cursor: Optional[str]
+) -> Response:
+    """Encodes a VideoListResponse-shaped body straight from stored documents.
+
+    Documents were validated by the Video model before they were indexed, so returning a Response
+    skips FastAPI's response_model validation and serialization; response_model still documents the shape.
+    """
+    body = orjson.dumps({
+        "total": total,
+        "page": page,
+        "size": len(videos),
+        "videos": videos,
+        "next_cursor": next_cursor
+    })
+    return Response(content=body, media_type="application/json")
+
+
 @app.get("/videos", response_model=VideoListResponse)
 async def get_videos(
-    page: int = Query(1, ge=1, description="Page number"),
-    size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Number of videos per page")
+    page: int = Query(1, ge=1, description="Page number (ignored when a cursor is given)"),
+    size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Number of videos per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    include_total: Optional[bool] = Query(None, description="Return total. Exact and on by default for page numbers; an approximate lower bound and off by default with a cursor")
 ):
     """
     Retrieves stored videos, sorted by publishing date-time in descending order (newest first).
+    Use page numbers for shallow pages and follow next_cursor to walk deeper.
     """
-    logger.info(f"Received request for /videos: page={page}, size={size}")
-    try:
-        videos, total = await es_utils.get_videos_paginated(page=page, size=size)
-        return VideoListResponse(
-            total=total,
-            page=page,
-            size=len(videos),
-            videos=videos
+    logger.info(f"Received request for /videos: page={page}, size={size}, cursor={'yes' if cursor else 'no'}")
+    if not cursor and page * size + 1 > ES_MAX_RESULT_WINDOW:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Page too deep for page-number pagination (max {ES_MAX_RESULT_WINDOW} results). Follow next_cursor instead."
         )
+    try:
+        hot_page = None if cursor else hot_tier.feed.page(page, size)
+        if hot_page is not None:
+            videos, total, next_cursor = hot_page
+            if include_total is False:
+                total = None
+        else:
+            videos, total, page, next_cursor = await es_utils.get_videos_paginated(
+                page=page, size=size, cursor=cursor, include_total=include_total
+            )
+        return video_list_response(videos, total, page, next_cursor)
+    except es_utils.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing /videos request: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error while fetching videos.")
 
 
+@app.get("/videos/export")
+async def export_videos(
+    request: Request,
+    published_after: Optional[datetime] = Query(None, description="Only videos published at or after this time"),
+    published_before: Optional[datetime] = Query(None, description="Only videos published before this time"),
+    fields: Optional[str] = Query(None, description="Comma-separated Video fields to include (default: all)")
+):
+    """
+    Streams every stored video as NDJSON (one JSON document per line).
+    The body is gzip-compressed on the fly when the client sends Accept-Encoding: gzip.
+    """
+    field_list = None
+    if fields:
+        field_list = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = set(field_list) - set(Video.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    logger.info(f"Received request for /videos/export: after={published_after}, before={published_before}, fields={field_list}, gzip={use_gzip}")
+
+    async def ndjson_stream():
+        compressor = zlib.compressobj(wbits=31) if use_gzip else None # wbits=31 -> gzip container
+        exported = 0
+        try:
+            async with aclosing(es_utils.iter_video_documents(published_after, published_before, field_list)) as batches:
+                async for batch in batches:
+                    chunk = b"".join(orjson.dumps(doc) + b"\n" for doc in batch)
+                    exported += len(batch)
+                    # Each batch is flushed to the client before the next slice is read, so a slow reader
+                    # holds back the Elasticsearch scan instead of growing a buffer
+                    yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+        except Exception as e:
+            # Headers are already sent, so the only signal left is the transport: re-raising makes the server
+            # abort the chunked response (and skips the gzip trailer) instead of ending it like a complete dump
+            logger.error(f"Export aborted after {exported} videos: {e}", exc_info=True)
+            raise
+        if compressor:
+            yield compressor.flush()
+        logger.info(f"Export finished: {exported} videos streamed.")
+
+    headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"} if use_gzip else {"Vary": "Accept-Encoding"}
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson", headers=headers)
+
+
 @app.get("/search", response_model=VideoListResponse)
 async def search_videos_api(
-    q: str = Query(..., min_length=1, description="Search query string")
+    q: str = Query(..., min_length=1, description="Search query string"),
+    size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Number of videos per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    track_total: bool = Query(False, description="Count all matching videos exactly (slower for broad queries)")
 ):
     """
     Searches stored videos by title and description.
     Supports partial matches and typo tolerance (fuzziness).
-    Results are filtered based on the provided score threshold.
+    Results are ordered by relevance and paginated with an opaque cursor.
     """
-    logger.info(f"Received request for /search: q='{q}'")
+    logger.info(f"Received request for /search: q='{q}', size={size}, cursor={'yes' if cursor else 'no'}")
+    cache_key = (cache_utils.normalize_query(q), size, cursor, track_total)
     try:
-        videos, total = await es_utils.search_videos(query=q)
-        return VideoListResponse(
-            total=total,
-            page=1,  # no pagination
-            size=len(videos),
-            videos=videos
-        )
+        cached = cache_utils.search_cache.get(cache_key)
+        if cached is not None:
+            videos, total, page, next_cursor = cached
+        else:
+            videos, total, page, next_cursor = await es_utils.search_videos(
+                query=q, size=size, cursor=cursor, track_total=track_total
+            )
+            cache_utils.search_cache.set(cache_key, (videos, total, page, next_cursor))
+        return video_list_response(videos, total, page, next_cursor)
+    except es_utils.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing /search request for query '{q}': {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error while searching videos.")
 
 
+@app.get("/suggest", response_model=SuggestResponse)
+async def suggest_api(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed so far"),
+    size: int = Query(SUGGEST_DEFAULT_SIZE, ge=1, le=SUGGEST_MAX_SIZE, description="Number of suggestions")
+):
+    """
+    Type-ahead suggestions: IDs and titles of the videos whose titles best match the typed prefix.
+    Meant to be called on every keystroke; use /search for full, typo-tolerant results.
+    """
+    cache_key = ("suggest", cache_utils.normalize_query(q), size)
+    try:
+        suggestions = cache_utils.search_cache.get(cache_key)
+        if suggestions is None:
+            suggestions = await es_utils.suggest_titles(q, size)
+            if suggestions:
+                cache_utils.search_cache.set(cache_key, suggestions)
+        return Response(content=orjson.dumps({"suggestions": suggestions}), media_type="application/json")
+    except Exception as e:
+        logger.error(f"Error processing /suggest request for prefix '{q}': {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error while fetching suggestions.")
+
+
 @app.get("/health", status_code=200)
 async def health_check():
-    """Basic health check endpoint."""
+    """Basic health check endpoint, including the fetcher leader's published state."""
     es_ping = False
+    fetcher_lease = None
     try:
         client = es_utils.get_es_client()
         if client:
             es_ping = await client.ping()
+            fetcher_lease = await es_utils.get_lease(worker.LEADER_LEASE_ID)
     except Exception:
         pass
 
-    return {"status": "ok", "elasticsearch_connected": es_ping}
+    return {
+        "status": "ok",
+        "elasticsearch_connected": es_ping,
+        "search_cache": cache_utils.search_cache.stats(),
+        "fetcher": fetcher_lease
+    }
+
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: request, Elasticsearch and YouTube latency, ingest counters and quota usage."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
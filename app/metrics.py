@@ -0,0 +1,127 @@
+import functools
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, TypeVar
+
+# Imported first: it loads .env, and prometheus_client picks multiprocess mode from PROMETHEUS_MULTIPROC_DIR on import
+from .config import METRICS_ENABLED, PROMETHEUS_MULTIPROC_DIR
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily
+
+F = TypeVar("F", bound=Callable[..., Awaitable])
+
+# Latency
+YOUTUBE_REQUEST_SECONDS = Histogram(
+    "yt_youtube_request_seconds", "YouTube Data API call latency", ["function"]
+)
+ES_REQUEST_SECONDS = Histogram(
+    "yt_es_request_seconds", "Elasticsearch query and index latency per es_utils function", ["function"],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "yt_http_request_seconds", "API request latency per endpoint", ["method", "route", "status"],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0)
+)
+
+# Ingest
+VIDEOS_FETCHED = Counter("yt_videos_fetched_total", "Videos returned by search.list", ["topic"])
+VIDEOS_SKIPPED = Counter("yt_videos_skipped_total", "Fetched videos dropped as already known", ["topic"])
+VIDEOS_INDEXED = Counter("yt_videos_indexed_total", "Videos written to Elasticsearch", ["topic"])
+
+# Quota
+YOUTUBE_QUOTA_UNITS = Counter("yt_youtube_quota_units_total", "Quota units spent per API key (masked)", ["key"])
+YOUTUBE_FORBIDDEN = Counter("yt_youtube_forbidden_total", "403 responses per API key (masked)", ["key"])
+
+
+def timed(histogram: Histogram) -> Callable[[F], F]:
+    """Records the run time of an async function in `histogram`, labelled with the function's name.
+
+    With metrics disabled the function is returned as is, so the decorator costs nothing at call time.
+    """
+    def decorator(func: F) -> F:
+        if not METRICS_ENABLED:
+            return func
+        observe = histogram.labels(func.__name__).observe
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - start)
+        return wrapper # type: ignore[return-value]
+    return decorator
+
+def inc(counter: Counter, amount: float, *labels: str):
+    if METRICS_ENABLED and amount:
+        counter.labels(*labels).inc(amount)
+
+
+class RequestTimingMiddleware:
+    """ASGI middleware recording HTTP_REQUEST_SECONDS per route template (not raw path, to bound label cardinality)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched") # set by the router once a route matches
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - start)
+
+
+class IngestLagCollector:
+    """Reports now minus each topic's watermark at scrape time, so a stalled topic shows a growing lag."""
+
+    def __init__(self, watermarks: Dict[str, datetime]):
+        self.watermarks = watermarks
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "yt_ingest_lag_seconds", "Seconds since the newest indexed video of each topic", labels=["topic"]
+        )
+        now = datetime.now(timezone.utc)
+        for topic, watermark in list(self.watermarks.items()):
+            gauge.add_metric([topic], (now - watermark).total_seconds())
+        yield gauge
+
+def register_ingest_lag(watermarks: Dict[str, datetime]):
+    """Adds the ingest-lag gauge; only the worker, which holds the watermarks, registers it."""
+    if METRICS_ENABLED:
+        REGISTRY.register(IngestLagCollector(watermarks))
+
+
+def render() -> bytes:
+    """This process's metrics, or with PROMETHEUS_MULTIPROC_DIR those of every process sharing the directory."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+def mark_process_dead():
+    """Called on shutdown so the multiprocess collector drops this process's live samples."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+def start_server(port: int):
+    """Serves /metrics on `port` from a background thread (for processes without an HTTP server of their own)."""
+    start_http_server(port)
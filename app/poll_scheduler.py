@@ -0,0 +1,115 @@
+import logging
+import math
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from .config import (
+    FETCH_INTERVAL_SECONDS, POLL_MIN_INTERVAL_SECONDS, POLL_MAX_INTERVAL_SECONDS,
+    POLL_TARGET_VIDEOS_PER_POLL, POLL_JITTER, POLL_RATE_SMOOTHING
+)
+from .pydantic_models import TopicPollState
+from . import yt_utils
+
+logger = logging.getLogger(__name__)
+
+# One quiet poll may at most double a topic's interval, so a single empty window cannot park it at the maximum
+MAX_INTERVAL_GROWTH = 2.0
+
+
+class AdaptivePollScheduler:
+    """Sets each topic's next poll from its recent arrival rate and the quota left in the key pool.
+
+    Busy topics are polled often enough to collect about POLL_TARGET_VIDEOS_PER_POLL videos per call and
+    quiet ones back off. The remaining daily quota is split between topics in proportion to the square root
+    of their arrival rates (which minimises the average staleness for a fixed number of polls), and no topic
+    polls faster than its share allows. Intervals are clamped to [min, max] and jittered.
+    """
+
+    def __init__(self, topics: List[str]):
+        now = time.monotonic()
+        self.topics = list(topics)
+        self._rate: Dict[str, Optional[float]] = {topic: None for topic in topics} # videos per second (EWMA)
+        self._last_poll: Dict[str, Optional[float]] = {topic: None for topic in topics}
+        self._interval: Dict[str, float] = {topic: float(FETCH_INTERVAL_SECONDS) for topic in topics}
+        self._next_due: Dict[str, float] = {topic: now for topic in topics}
+
+    def due_topics(self) -> List[str]:
+        now = time.monotonic()
+        return [topic for topic in self.topics if self._next_due[topic] <= now]
+
+    def seconds_until_next(self) -> float:
+        return max(min(self._next_due.values()) - time.monotonic(), 0.0)
+
+    def _weight(self, topic: str) -> float:
+        # Unknown or zero rates still get a small share so quiet topics are polled eventually
+        return math.sqrt(max(self._rate[topic] or 0.0, 1e-4))
+
+    def _quota_interval(self, topic: str) -> float:
+        """Shortest interval this topic can afford with its share of the quota left before the reset."""
+        remaining_units = yt_utils.key_scheduler.total_remaining()
+        seconds_to_reset = (yt_utils.next_quota_reset() - datetime.now(timezone.utc)).total_seconds()
+        affordable_polls = remaining_units / yt_utils.SEARCH_LIST_COST
+        if affordable_polls < 1:
+            return seconds_to_reset
+        share = self._weight(topic) / sum(self._weight(t) for t in self.topics)
+        return seconds_to_reset / (affordable_polls * share)
+
+    def record_poll(self, topic: str, new_videos: int, since: Optional[datetime] = None):
+        """Updates the topic's arrival rate after a successful poll and schedules its next one.
+
+        The first poll of a topic has no previous poll to measure from; its videos are spread over the time
+        since `since` (the topic's watermark before the poll) instead, if known.
+        """
+        now = time.monotonic()
+        last_poll = self._last_poll[topic]
+        self._last_poll[topic] = now
+        elapsed = None
+        if last_poll is not None:
+            elapsed = now - last_poll
+        elif since is not None:
+            elapsed = (datetime.now(timezone.utc) - since).total_seconds()
+        if elapsed is not None and elapsed > 0:
+            sample = new_videos / elapsed
+            previous = self._rate[topic]
+            self._rate[topic] = sample if previous is None else (
+                POLL_RATE_SMOOTHING * sample + (1 - POLL_RATE_SMOOTHING) * previous
+            )
+
+        rate = self._rate[topic]
+        if rate is None:
+            interval = float(FETCH_INTERVAL_SECONDS)
+        elif rate > 0:
+            interval = POLL_TARGET_VIDEOS_PER_POLL / rate
+        else:
+            interval = POLL_MAX_INTERVAL_SECONDS
+        interval = min(interval, self._interval[topic] * MAX_INTERVAL_GROWTH)
+        interval = max(interval, self._quota_interval(topic))
+        interval = min(max(interval, POLL_MIN_INTERVAL_SECONDS), POLL_MAX_INTERVAL_SECONDS)
+        self._interval[topic] = interval
+        # Jitter spreads topics apart so they do not all hit the API in the same instant
+        self._next_due[topic] = now + interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+    def record_failure(self, topic: str):
+        """Retries a failed poll after the current interval without touching the arrival rate.
+
+        The next successful poll measures from the last successful one, since it fetches everything that arrived meanwhile.
+        """
+        self._next_due[topic] = time.monotonic() + self._interval[topic] * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+    def postpone(self, topic: str, seconds: float):
+        """Pushes a topic's next poll back, e.g. when no API key had quota for it."""
+        self._next_due[topic] = time.monotonic() + seconds
+
+    def states(self) -> List[TopicPollState]:
+        now = time.monotonic()
+        return [
+            TopicPollState(
+                topic=topic,
+                interval_seconds=round(self._interval[topic], 2),
+                next_poll_in_seconds=round(max(self._next_due[topic] - now, 0.0), 2),
+                arrival_rate_per_hour=None if self._rate[topic] is None else round(self._rate[topic] * 3600, 2)
+            )
+            for topic in self.topics
+        ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 
 class Video(BaseModel):
@@ -10,11 +10,75 @@ class Video(BaseModel):
     published_at: datetime = Field(..., description="Video publishing timestamp")
     thumbnails: HttpUrl = Field(..., description="thumbnail")
     indexed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    topic: Optional[str] = Field(None, description="Search topic that fetched this video")
+    view_count: Optional[int] = Field(None, description="View count at stats_updated_at, filled in by enrichment")
+    like_count: Optional[int] = Field(None, description="Like count at stats_updated_at (null if hidden or not yet enriched)")
+    duration_seconds: Optional[int] = Field(None, description="Video length in seconds, filled in by enrichment")
+    stats_updated_at: Optional[datetime] = Field(None, description="When the statistics were last fetched with videos.list")
+
+
+class VideoStats(BaseModel):
+    """statistics and duration of one video from videos.list."""
+    video_id: str = Field(..., description="YouTube video ID")
+    view_count: Optional[int] = Field(None, description="View count")
+    like_count: Optional[int] = Field(None, description="Like count (null if hidden)")
+    duration_seconds: Optional[int] = Field(None, description="Video length in seconds")
+    stats_updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class VideoListResponse(BaseModel):
     """response for paginated video lists."""
-    total: int = Field(..., description="Total number of videos matching the criteria")
+    total: Optional[int] = Field(..., description="Total number of videos matching the criteria (null when not tracked)")
     page: int = Field(..., description="Current page number")
     size: int = Field(..., description="Number of videos per page")
-    videos: List[Video] = Field(..., description="List of video objects for the current page")
\ No newline at end of file
+    videos: List[Video] = Field(..., description="List of video objects for the current page")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page, null on the last page")
+
+class VideoSuggestion(BaseModel):
+    """one type-ahead match."""
+    video_id: str = Field(..., description="YouTube video ID")
+    title: str = Field(..., description="Video title")
+
+class SuggestResponse(BaseModel):
+    """response for /suggest."""
+    suggestions: List[VideoSuggestion] = Field(..., description="Best title matches for the typed prefix, best first")
+
+class BulkIndexResult(BaseModel):
+    """per-document outcome of a bulk index call."""
+    indexed: List[str] = Field(default_factory=list, description="IDs of videos written successfully")
+    created: List[str] = Field(default_factory=list, description="IDs among `indexed` that were new documents rather than overwrites")
+    failed: Dict[str, str] = Field(default_factory=dict, description="IDs of videos that failed, mapped to the error reason")
+    rejected: List[str] = Field(default_factory=list, description="IDs among `failed` with a permanent error (e.g. a mapping conflict) that retrying cannot fix")
+
+
+class TopicProgress(BaseModel):
+    """how far a topic's page walk got; applied once every batch queued before it is durable."""
+    watermark: Optional[datetime] = Field(None, description="New watermark, set when the walk reached its last page")
+    resume_before: Optional[datetime] = Field(None, description="publishedBefore bound of the range a cut-short walk still has to fetch")
+    resume_newest: Optional[datetime] = Field(None, description="Newest video the cut-short walk fetched; the watermark once the range is drained")
+
+
+class IndexBatch(BaseModel):
+    """videos from one fetched page waiting to be written; also the journal line format."""
+    seq: int = Field(..., description="Monotonic sequence number, the order batches are written and replayed in")
+    topic: str = Field(..., description="Search topic the videos were fetched for")
+    videos: List[Video] = Field(..., description="Videos to index")
+    progress: Optional[TopicProgress] = Field(None, description="Topic progress to record once this batch is durable")
+
+
+class ApiKeyState(BaseModel):
+    """quota bookkeeping for one YouTube API key."""
+    key: str = Field(..., description="Masked API key")
+    used_units: int = Field(..., description="Estimated quota units spent in the current quota day")
+    remaining_units: int = Field(..., description="Estimated quota units left in the current quota day")
+    requests: int = Field(..., description="Requests made with this key in the current quota day")
+    forbidden_count: int = Field(..., description="403 responses received in the current quota day")
+    cooldown_until: Optional[datetime] = Field(None, description="Key is skipped until this time (next quota reset) after a 403")
+
+
+class TopicPollState(BaseModel):
+    """adaptive polling state for one topic."""
+    topic: str = Field(..., description="Search topic")
+    interval_seconds: float = Field(..., description="Computed interval between polls")
+    next_poll_in_seconds: float = Field(..., description="Time until the next poll")
+    arrival_rate_per_hour: Optional[float] = Field(None, description="Smoothed rate of new videos, null until two polls were made")
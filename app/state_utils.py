@@ -0,0 +1,214 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import ES_MAX_RESULT_WINDOW, INGEST_STATE_PATH, SEEN_IDS_CAPACITY
+from .pydantic_models import TopicProgress, Video
+from . import es_utils
+from . import yt_utils
+
+logger = logging.getLogger(__name__)
+
+
+
+class SeenIdFilter:
+    """Bounded LRU set of recently indexed video IDs, used to drop re-fetched videos before they are written."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._ids
+
+    def add(self, video_ids: Iterable[str]):
+        if self.capacity <= 0:
+            return
+        for video_id in video_ids:
+            self._ids[video_id] = None
+            self._ids.move_to_end(video_id)
+        while len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+
+    def split(self, videos: List[Video]) -> Tuple[List[Video], List[Video]]:
+        """Splits videos into (unseen, seen), counting the seen ones as dropped."""
+        unseen = [video for video in videos if video.video_id not in self._ids]
+        seen = [video for video in videos if video.video_id in self._ids]
+        self.dropped += len(seen)
+        return unseen, seen
+
+    def ids(self) -> List[str]:
+        """IDs from least to most recently seen, the order `add` restores them in."""
+        return list(self._ids)
+
+    def clear(self):
+        self._ids.clear()
+
+
+# Per-topic publishedAfter watermarks and recently indexed IDs, kept in memory and checkpointed to INGEST_STATE_PATH
+topic_watermarks: Dict[str, datetime] = {}
+# Per-topic (publishedBefore, newest fetched) of a page walk that was cut short: [watermark, publishedBefore)
+# is still to be fetched, and the watermark moves to the newest fetched video once it is
+topic_resume: Dict[str, Tuple[datetime, datetime]] = {}
+seen_ids = SeenIdFilter(SEEN_IDS_CAPACITY)
+_save_lock = asyncio.Lock()
+
+def load_state() -> bool:
+    """Loads the watermark checkpoint from disk. Returns False if it is missing or unreadable."""
+    if not os.path.exists(INGEST_STATE_PATH):
+        logger.info(f"No ingest checkpoint at '{INGEST_STATE_PATH}'. Watermarks will be read from Elasticsearch.")
+        return False
+    try:
+        with open(INGEST_STATE_PATH, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        topic_watermarks.clear()
+        for topic, timestamp_str in state.get("watermarks", {}).items():
+            topic_watermarks[topic] = datetime.fromisoformat(timestamp_str)
+        topic_resume.clear()
+        for topic, (before_str, newest_str) in state.get("resume", {}).items():
+            topic_resume[topic] = (datetime.fromisoformat(before_str), datetime.fromisoformat(newest_str))
+        seen_ids.clear()
+        seen_ids.add(state.get("seen_ids", []))
+        yt_utils.key_scheduler.restore(state.get("api_keys"))
+        logger.info(f"Loaded ingest checkpoint with {len(topic_watermarks)} topic watermark(s) and {len(seen_ids)} seen ID(s).")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to read ingest checkpoint '{INGEST_STATE_PATH}': {e}", exc_info=True)
+        return False
+
+def load_key_usage():
+    """Restores only the API key usage from the checkpoint (see `save_key_usage`)."""
+    if not os.path.exists(INGEST_STATE_PATH):
+        return
+    try:
+        with open(INGEST_STATE_PATH, 'r', encoding='utf-8') as f:
+            yt_utils.key_scheduler.restore(json.load(f).get("api_keys"))
+    except Exception as e:
+        logger.error(f"Failed to read API key usage from '{INGEST_STATE_PATH}': {e}", exc_info=True)
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Holds an exclusive lock on `path`.lock across processes (blocking, so call it from a thread).
+
+    Worker replicas share the data directory, and during a leader handover the old leader may still be
+    journaling or checkpointing while the new one starts; asyncio locks only order writes within a process.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def _write_atomically(path: str, payload: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.ingest_state.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # rename is atomic, so readers see either the old or the new checkpoint, never a partial one
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _merge_and_write(path: str, state: Dict[str, Any]):
+    """Writes the checkpoint without undoing another process's progress.
+
+    After a leader handover the old leader may still save while the new one already moved on, so
+    watermarks never move back and resume points the merged watermark has passed are dropped. Parts
+    missing from `state` are kept as they are on disk.
+    """
+    with file_lock(path):
+        on_disk: Dict[str, Any] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    on_disk = json.load(f)
+            except ValueError as e:
+                logger.warning(f"Overwriting unreadable ingest checkpoint '{path}': {e}")
+        watermarks = {topic: datetime.fromisoformat(ts) for topic, ts in on_disk.get("watermarks", {}).items()}
+        for topic, ts in state.get("watermarks", {}).items():
+            if topic not in watermarks or ts > watermarks[topic]:
+                watermarks[topic] = ts
+        resume = {topic: (datetime.fromisoformat(before), datetime.fromisoformat(newest)) for topic, (before, newest) in on_disk.get("resume", {}).items()}
+        resume.update(state.get("resume", {}))
+        merged = {
+            "watermarks": {topic: ts.isoformat() for topic, ts in watermarks.items()},
+            "resume": {
+                topic: [before.isoformat(), newest.isoformat()] for topic, (before, newest) in resume.items()
+                if topic not in watermarks or before > watermarks[topic]
+            },
+            "seen_ids": state["seen_ids"] if "seen_ids" in state else on_disk.get("seen_ids", []),
+            "api_keys": yt_utils.merge_key_usage(on_disk.get("api_keys"), state.get("api_keys")),
+            "saved_at": datetime.now(timezone.utc).isoformat()
+        }
+        _write_atomically(path, json.dumps(merged))
+
+async def save_state():
+    """Persists the current watermarks, seen IDs and API key usage to the checkpoint file (write to temp file + rename)."""
+    await _save({
+        "watermarks": dict(topic_watermarks),
+        "resume": dict(topic_resume),
+        "seen_ids": seen_ids.ids(),
+        "api_keys": yt_utils.key_scheduler.snapshot()
+    })
+
+async def save_key_usage():
+    """Checkpoints only the API key usage, for processes like the backfill that share the keys but not the watermarks."""
+    await _save({"api_keys": yt_utils.key_scheduler.snapshot()})
+
+async def _save(state: Dict[str, Any]):
+    async with _save_lock:
+        try:
+            await asyncio.to_thread(_merge_and_write, INGEST_STATE_PATH, state)
+        except Exception as e:
+            logger.error(f"Failed to write ingest checkpoint '{INGEST_STATE_PATH}': {e}", exc_info=True)
+
+async def get_watermark(topic: str) -> Optional[datetime]:
+    """Returns the topic's watermark, querying Elasticsearch only if the topic has no checkpointed value."""
+    if topic not in topic_watermarks:
+        latest_timestamp = await es_utils.get_latest_video_timestamp(topic=topic)
+        if latest_timestamp is None:
+            return None
+        topic_watermarks[topic] = latest_timestamp
+    return topic_watermarks[topic]
+
+async def apply_progress(topic: str, progress: TopicProgress):
+    """Records a finished walk (watermark moves up, resume point cleared) or a cut-short one (resume point set), and checkpoints it."""
+    if progress.watermark is not None:
+        current = topic_watermarks.get(topic)
+        if current is None or progress.watermark > current:
+            topic_watermarks[topic] = progress.watermark
+        topic_resume.pop(topic, None)
+    elif progress.resume_before is not None and progress.resume_newest is not None:
+        topic_resume[topic] = (progress.resume_before, progress.resume_newest)
+    else:
+        return
+    await save_state()
+
+async def warm_seen_ids():
+    """Adds the IDs of the newest indexed videos to the seen filter (on top of any checkpointed ones)."""
+    limit = min(SEEN_IDS_CAPACITY, ES_MAX_RESULT_WINDOW)
+    if limit <= 0:
+        return
+    recent_ids = await es_utils.get_recent_video_ids(limit)
+    # newest first from ES; added oldest first so the newest are the last to be evicted
+    seen_ids.add(reversed(recent_ids))
+    logger.info(f"Seen-ID filter warmed with {len(recent_ids)} recent IDs ({len(seen_ids)} total).")
@@ -0,0 +1,134 @@
+"""Standalone fetcher process: `python -m app.worker`.
+
+Any number of workers may run; they elect a leader through a lease document in Elasticsearch and only
+the leader polls YouTube and writes to the index. The others stand by and take over once the leader's
+lease expires or is released.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from typing import Optional
+
+from .config import (
+    ES_PARTITION_MAINTENANCE_SECONDS, ES_RETENTION_DAYS, FETCHER_LEASE_RENEW_SECONDS, FETCHER_LEASE_SAFETY_SECONDS,
+    FETCHER_LEASE_TTL_SECONDS, METRICS_ENABLED, METRICS_PORT
+)
+from . import es_utils
+from . import yt_utils
+from . import state_utils
+from . import fetcher
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+LEADER_LEASE_ID = "fetcher-leader"
+worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+async def setup_clients():
+    """Connects to Elasticsearch, ensures the indices exist and opens the YouTube HTTP client."""
+    es_client = es_utils.get_es_client()
+    if not await es_client.ping():
+        raise ConnectionError("Elasticsearch connection failed!")
+    await es_utils.ensure_index_exists()
+    # Only workers write, so they move a pre-partitioning index into partitions before anything is fetched
+    await es_utils.migrate_legacy_index()
+    await es_utils.backfill_title_suggest()
+    await es_utils.ensure_meta_index_exists()
+    yt_utils.get_http_client()
+
+async def maintain_partitions():
+    """Creates the current period's partition and drops partitions past retention."""
+    try:
+        await es_utils.ensure_current_partition()
+        await es_utils.drop_expired_partitions(ES_RETENTION_DAYS)
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {e}", exc_info=True)
+
+async def stop_fetch_task(fetch_task: Optional[asyncio.Task], timeout: float):
+    """Asks the fetch task to finish, cancelling it after `timeout` seconds (the time left on our lease)."""
+    if fetch_task is None:
+        return
+    fetcher.shutdown_event.set()
+    try:
+        await asyncio.wait_for(fetch_task, timeout=max(timeout, 0.0))
+    except asyncio.TimeoutError:
+        logger.warning("Fetch task did not finish in time. Cancelling.")
+        fetch_task.cancel()
+    except Exception as e:
+        logger.error(f"Error during fetch task shutdown: {e}", exc_info=True)
+
+async def run_leader_loop(stop_event: asyncio.Event):
+    """Holds or competes for the fetcher lease, running periodic_fetch only while this process leads."""
+    fetch_task: Optional[asyncio.Task] = None
+    lease_valid_until = 0.0 # monotonic time until which our last successful renewal is good
+    last_maintenance = None
+    logger.info(f"Fetcher worker {worker_id} started; competing for leadership.")
+    try:
+        while not stop_event.is_set():
+            # expires_at is computed before the request is sent, so the lease is counted from before it too;
+            # a slow renewal must not stretch our view of the lease past what standbys see
+            attempt_started = time.monotonic()
+            try:
+                is_leader = await asyncio.wait_for(
+                    es_utils.acquire_lease(LEADER_LEASE_ID, worker_id, FETCHER_LEASE_TTL_SECONDS, status=fetcher.status_snapshot()),
+                    timeout=FETCHER_LEASE_RENEW_SECONDS
+                )
+                if is_leader:
+                    lease_valid_until = attempt_started + FETCHER_LEASE_TTL_SECONDS - FETCHER_LEASE_SAFETY_SECONDS
+            except Exception as e:
+                # Cannot reach ES: keep fetching only while the lease we last renewed is still valid
+                logger.error(f"Failed to renew fetcher lease: {e}", exc_info=True)
+                is_leader = time.monotonic() < lease_valid_until
+
+            if is_leader and fetch_task is None:
+                logger.info(f"Worker {worker_id} is now the fetcher leader.")
+                # Another worker may have advanced the checkpoint while we stood by
+                state_utils.load_state()
+                await state_utils.warm_seen_ids()
+                fetcher.shutdown_event.clear()
+                fetch_task = asyncio.create_task(fetcher.periodic_fetch())
+            elif not is_leader and fetch_task is not None:
+                logger.warning(f"Worker {worker_id} lost fetcher leadership. Stopping fetch task.")
+                await stop_fetch_task(fetch_task, lease_valid_until - time.monotonic())
+                fetch_task = None
+
+            if is_leader and (last_maintenance is None or time.monotonic() - last_maintenance >= ES_PARTITION_MAINTENANCE_SECONDS):
+                last_maintenance = time.monotonic()
+                await maintain_partitions()
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=FETCHER_LEASE_RENEW_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await stop_fetch_task(fetch_task, lease_valid_until - time.monotonic())
+        if fetch_task is not None:
+            await es_utils.release_lease(LEADER_LEASE_ID, worker_id)
+        logger.info(f"Fetcher worker {worker_id} stopped.")
+
+async def main():
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    metrics.register_ingest_lag(state_utils.topic_watermarks)
+    if METRICS_ENABLED and METRICS_PORT:
+        metrics.start_server(METRICS_PORT)
+        logger.info(f"Serving Prometheus metrics on port {METRICS_PORT}.")
+
+    try:
+        await setup_clients()
+        await run_leader_loop(stop_event)
+    finally:
+        await yt_utils.close_http_client()
+        await es_utils.close_es_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .config import (
+    WRITE_JOURNAL_PATH, WRITE_QUEUE_MAX_BATCHES, WRITE_QUEUE_PUT_TIMEOUT_SECONDS, WRITE_RETRY_BASE_SECONDS,
+    WRITE_RETRY_MAX_ATTEMPTS, WRITE_RETRY_MAX_SECONDS
+)
+from .pydantic_models import IndexBatch, TopicProgress, Video
+from . import es_utils
+from . import state_utils
+from . import cache_utils
+from . import hot_tier
+from . import enrichment
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _append_lines(path: str, lines: List[str]):
+    # Locked against another worker rotating the same journal (see WriteBehindQueue._replay)
+    with state_utils.file_lock(path), open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+def _read_batches(path: str) -> List[IndexBatch]:
+    if not os.path.exists(path):
+        return []
+    batches = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                batches.append(IndexBatch.model_validate_json(line))
+            except ValueError as e:
+                # A torn last line from a crash mid-append; everything before it is intact
+                logger.error(f"Skipping unreadable line {line_no} in write journal '{path}': {e}")
+    return batches
+
+def _rewrite_batches(path: str, batches: List[IndexBatch]):
+    if not batches:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    state_utils._write_atomically(path, ''.join(batch.model_dump_json() + '\n' for batch in batches))
+
+
+class WriteBehindQueue:
+    """Bounded queue of fetched batches drained into Elasticsearch by a single writer task.
+
+    Failed writes are retried with exponential backoff. Batches that still cannot be written, or that
+    do not fit in the queue in time, are appended to a local journal and replayed in sequence order once
+    Elasticsearch is reachable again, so fetching keeps its pace without losing data or growing memory.
+    """
+
+    def __init__(self, max_batches: int, journal_path: str):
+        self.max_batches = max_batches
+        self.journal_path = journal_path
+        # The writer moves the journal here before replaying, so new spills go to a fresh journal meanwhile
+        self.replay_path = journal_path + '.replaying'
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._journal_lock = asyncio.Lock()
+        self._held: List[IndexBatch] = [] # batches taken off the queue by the writer but not yet durable
+        self._last_seq = 0
+        self.pending_ids: Set[str] = set() # videos queued or in flight, not yet indexed or journaled
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def _next_seq(self) -> int:
+        # Wall-clock based so batches journaled by an earlier process sort before new ones
+        self._last_seq = max(self._last_seq + 1, time.time_ns())
+        return self._last_seq
+
+    def _journal_pending(self) -> bool:
+        return os.path.exists(self.journal_path) or os.path.exists(self.replay_path)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(WRITE_RETRY_BASE_SECONDS * (2 ** attempt), WRITE_RETRY_MAX_SECONDS)
+
+    def start(self):
+        if self._writer_task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_batches)
+            self._writer_task = asyncio.create_task(self._run())
+            logger.info("Write-behind writer started.")
+
+    async def stop(self):
+        """Stops the writer and journals everything that was not written yet."""
+        if self._writer_task is None:
+            return
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Write-behind writer failed: {e}", exc_info=True)
+        self._writer_task = None
+        leftover = self._held + self._drain_queue()
+        self._held = []
+        if leftover:
+            logger.info(f"Journaling {len(leftover)} unwritten batch(es) on shutdown.")
+            await self._spill(leftover)
+        self._queue = None
+
+    async def submit(self, topic: str, videos: List[Video], progress: Optional[TopicProgress] = None):
+        """Queues videos for indexing, waiting briefly for room and journaling the batch if there is none.
+
+        `progress` is recorded for the topic once this batch and every batch queued before it are durable.
+        """
+        if not videos and progress is None:
+            return
+        batch = IndexBatch(seq=self._next_seq(), topic=topic, videos=videos, progress=progress)
+        self.pending_ids.update(video.video_id for video in videos)
+        if self._queue is None:
+            await self._spill([batch])
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(batch), timeout=WRITE_QUEUE_PUT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Write queue full for {WRITE_QUEUE_PUT_TIMEOUT_SECONDS}s. Journaling batch of {len(videos)} videos for topic '{topic}'.")
+            await self._spill([batch])
+
+    def _drain_queue(self) -> List[IndexBatch]:
+        batches = []
+        while self._queue is not None and not self._queue.empty():
+            batches.append(self._queue.get_nowait())
+        return batches
+
+    async def _spill(self, batches: List[IndexBatch]) -> bool:
+        """Appends batches to the journal; once they are durable their topic progress is recorded."""
+        try:
+            async with self._journal_lock:
+                await asyncio.to_thread(_append_lines, self.journal_path, [batch.model_dump_json() for batch in batches])
+        except Exception as e:
+            logger.error(f"Failed to journal {len(batches)} batch(es) to '{self.journal_path}': {e}", exc_info=True)
+            for batch in batches:
+                self.pending_ids.difference_update(video.video_id for video in batch.videos)
+            return False
+        self.spilled += len(batches)
+        for batch in batches:
+            await self._mark_durable(batch)
+        return True
+
+    def _mark_indexed(self, videos: List[Video]):
+        ids = [video.video_id for video in videos]
+        self.pending_ids.difference_update(ids)
+        state_utils.seen_ids.add(ids)
+
+    async def _mark_durable(self, batch: IndexBatch):
+        self._mark_indexed(batch.videos)
+        if batch.progress is not None:
+            await state_utils.apply_progress(batch.topic, batch.progress)
+
+    async def _write(self, batch: IndexBatch) -> Tuple[List[Video], List[str], List[Video], List[Video]]:
+        """Bulk indexes a batch, retrying transient failures with backoff. Returns (indexed, created IDs, rejected, failed).
+
+        Rejected videos hit a permanent error such as a mapping conflict; failed ones still timed out or got
+        429/5xx responses after the last attempt.
+        """
+        remaining = batch.videos
+        indexed: List[Video] = []
+        created: List[str] = []
+        rejected: List[Video] = []
+        for attempt in range(WRITE_RETRY_MAX_ATTEMPTS):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+            result = await es_utils.bulk_index_videos(remaining)
+            indexed_ids, rejected_ids = set(result.indexed), set(result.rejected)
+            indexed.extend(video for video in remaining if video.video_id in indexed_ids)
+            created.extend(result.created)
+            rejected.extend(video for video in remaining if video.video_id in rejected_ids)
+            remaining = [video for video in remaining if video.video_id in result.failed and video.video_id not in rejected_ids]
+            if not remaining:
+                break
+        return indexed, created, rejected, remaining
+
+    async def _process(self, batch: IndexBatch, replaying: bool = False) -> bool:
+        """Writes one batch and runs its post-index hooks. Returns False only for a replayed batch that Elasticsearch could not take."""
+        indexed, created, rejected, failed = await self._write(batch) if batch.videos else ([], [], [], [])
+        if indexed:
+            self.written += len(indexed)
+            metrics.inc(metrics.VIDEOS_INDEXED, len(indexed), batch.topic)
+            cache_utils.bump_generation()
+            hot_tier.feed.add(indexed, created_count=len(created))
+            self._mark_indexed(indexed)
+            enrichment.enricher.submit_videos(indexed)
+            # Tells API processes to drop cached searches and refresh their hot tier
+            await es_utils.publish_ingest_generation()
+        if rejected:
+            # Elasticsearch refuses these documents themselves; retrying them will not help
+            self.rejected += len(rejected)
+            self.pending_ids.difference_update(video.video_id for video in rejected)
+            logger.error(f"Dropping {len(rejected)} video(s) for topic '{batch.topic}' rejected by Elasticsearch: {[video.video_id for video in rejected][:5]}")
+        if failed:
+            # Down, timing out or overloaded (429/5xx): kept like an outage until Elasticsearch takes them
+            if replaying:
+                return False # the batch stays in the replay file
+            logger.warning(f"Elasticsearch unavailable or overloaded. Journaling {len(failed)} unwritten video(s) for topic '{batch.topic}'.")
+            await self._spill([batch.model_copy(update={"videos": failed})]) # records the progress once journaled
+            return True
+        # A replayed batch's progress was recorded when it was journaled
+        if batch.progress is not None and not replaying:
+            await state_utils.apply_progress(batch.topic, batch.progress)
+        return True
+
+    async def _replay(self) -> bool:
+        """Writes journaled batches in sequence order. Returns False if Elasticsearch went away again."""
+        async with self._journal_lock:
+            def rotate():
+                # A stopping leader may still append to the shared journal; without the file lock its lines
+                # could land between the read and the remove and be lost
+                with state_utils.file_lock(self.journal_path):
+                    batches = _read_batches(self.replay_path) + _read_batches(self.journal_path)
+                    _rewrite_batches(self.replay_path, sorted(batches, key=lambda b: b.seq))
+                    if os.path.exists(self.journal_path):
+                        os.remove(self.journal_path)
+            await asyncio.to_thread(rotate)
+        batches = await asyncio.to_thread(_read_batches, self.replay_path)
+        if batches:
+            logger.info(f"Replaying {len(batches)} journaled batch(es).")
+        for i, batch in enumerate(batches):
+            if not await self._process(batch, replaying=True):
+                # Keep the rest (including the partly written batch) for the next attempt
+                await asyncio.to_thread(_rewrite_batches, self.replay_path, batches[i:])
+                return False
+            self.replayed += 1
+        await asyncio.to_thread(_rewrite_batches, self.replay_path, [])
+        return True
+
+    async def _run(self):
+        failures = 0
+        while True:
+            try:
+                if self._journal_pending():
+                    # Queued batches are newer than journaled ones only if nothing spilled since; journal them
+                    # too so replay sees one sequence-ordered stream
+                    self._held = self._drain_queue()
+                    if self._held:
+                        await self._spill(self._held)
+                    self._held = []
+                    if not await self._replay():
+                        failures += 1
+                        delay = self._backoff(failures)
+                        logger.warning(f"Elasticsearch unavailable; retrying journal replay in {delay:.1f}s.")
+                        await asyncio.sleep(delay)
+                        continue
+                    failures = 0
+                    logger.info("Write journal fully replayed.")
+                    continue
+
+                batch = await self._queue.get()
+                self._held = [batch]
+                await self._process(batch)
+                self._held = []
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in write-behind writer: {e}", exc_info=True)
+                await asyncio.sleep(self._backoff(0))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued_batches": self._queue.qsize() if self._queue is not None else 0,
+            "journal_pending": self._journal_pending(),
+            "written": self.written,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "retries": self.retries,
+            "rejected": self.rejected
+        }
+
+
+writer = WriteBehindQueue(WRITE_QUEUE_MAX_BATCHES, WRITE_JOURNAL_PATH)
@@ -1,44 +1,258 @@
+import hashlib
 import httpx
 import logging
-from datetime import datetime, timezone, timedelta
-from typing import List, Optional
-from itertools import cycle
+import re
+from datetime import date, datetime, time, timezone, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 
-from .config import YOUTUBE_API_KEYS
-from .pydantic_models import Video
+from .config import (
+    YOUTUBE_API_KEYS, YOUTUBE_DAILY_QUOTA_PER_KEY, YOUTUBE_HTTP_MAX_CONNECTIONS, YOUTUBE_HTTP_MAX_KEEPALIVE,
+    YOUTUBE_HTTP_KEEPALIVE_EXPIRY, YOUTUBE_HTTP_TIMEOUT, YOUTUBE_HTTP_CONNECT_TIMEOUT, YOUTUBE_HTTP2,
+    YOUTUBE_MAX_PAGES_PER_FETCH, YOUTUBE_MAX_UNITS_PER_FETCH
+)
+from .pydantic_models import ApiKeyState, Video, VideoStats
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
-# Simple API key rotation using itertools.cycle
-if YOUTUBE_API_KEYS:
-    api_key_cycler = cycle(YOUTUBE_API_KEYS)
-    current_api_key_index = 0
-else:
+# Global HTTP client shared by all YouTube API calls (connection pool + keep-alive)
+http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None:
+        http2 = YOUTUBE_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("YOUTUBE_HTTP2 is enabled but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+                http2 = False
+        logger.info(f"Initializing YouTube HTTP client (max_connections={YOUTUBE_HTTP_MAX_CONNECTIONS}, http2={http2})")
+        http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=YOUTUBE_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=YOUTUBE_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=YOUTUBE_HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(YOUTUBE_HTTP_TIMEOUT, connect=YOUTUBE_HTTP_CONNECT_TIMEOUT)
+        )
+    return http_client
+
+async def close_http_client():
+    """Closes the shared YouTube HTTP client and its pooled connections."""
+    global http_client
+    if http_client:
+        logger.info("Closing YouTube HTTP client.")
+        await http_client.aclose()
+        http_client = None
+
+# Quota costs (units) of the YouTube Data API methods we call
+SEARCH_LIST_COST = 100
+VIDEOS_LIST_COST = 1 # per call, for up to 50 IDs
+
+# Daily quotas reset at midnight Pacific time
+QUOTA_RESET_TZ = ZoneInfo("America/Los_Angeles")
+
+def next_quota_reset(now: Optional[datetime] = None) -> datetime:
+    """Returns the next Pacific-midnight quota reset as a UTC datetime."""
+    now = now or datetime.now(timezone.utc)
+    local_now = now.astimezone(QUOTA_RESET_TZ)
+    next_midnight = datetime.combine(local_now.date() + timedelta(days=1), time.min, tzinfo=QUOTA_RESET_TZ)
+    return next_midnight.astimezone(timezone.utc)
+
+def _mask_key(key: str) -> str:
+    return f"{key[:4]}...{key[-4:]}" if len(key) > 8 else "***"
+
+def _key_id(key: str) -> str:
+    # Identifies a key in the checkpoint without writing the key itself to disk
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+def merge_key_usage(saved: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Combines two `ApiKeyScheduler.snapshot()`s: the later quota day wins, and on the same day each key keeps
+    its highest counts and latest cool-down, so a process that restored the other's usage never counts it twice."""
+    if not saved or not current or saved.get("quota_day") != current.get("quota_day"):
+        candidates = [snapshot for snapshot in (saved, current) if snapshot]
+        return max(candidates, key=lambda snapshot: snapshot.get("quota_day", "")) if candidates else None
+    keys = dict(saved.get("keys", {}))
+    for key_id, entry in current.get("keys", {}).items():
+        other = keys.get(key_id)
+        if other is None:
+            keys[key_id] = entry
+            continue
+        cooldowns = [until for until in (other.get("cooldown_until"), entry.get("cooldown_until")) if until]
+        keys[key_id] = {
+            "used": max(other.get("used", 0), entry.get("used", 0)),
+            "requests": max(other.get("requests", 0), entry.get("requests", 0)),
+            "forbidden": max(other.get("forbidden", 0), entry.get("forbidden", 0)),
+            "cooldown_until": max(cooldowns, key=datetime.fromisoformat) if cooldowns else None
+        }
+    return {"quota_day": current["quota_day"], "keys": keys}
+
+
+class ApiKeyScheduler:
+    """Hands out the API key with the most estimated quota headroom, skipping keys on cool-down."""
+
+    def __init__(self, keys: List[str], daily_quota: int):
+        self.daily_quota = daily_quota
+        self._quota_day: Optional[date] = None
+        self._used: Dict[str, int] = {key: 0 for key in keys}
+        self._requests: Dict[str, int] = {key: 0 for key in keys}
+        self._forbidden: Dict[str, int] = {key: 0 for key in keys}
+        self._cooldown_until: Dict[str, datetime] = {}
+
+    def _roll_quota_day(self, now: datetime):
+        """Clears usage and cool-downs once the Pacific quota day changes."""
+        today = now.astimezone(QUOTA_RESET_TZ).date()
+        if self._quota_day != today:
+            if self._quota_day is not None:
+                logger.info("YouTube quota day rolled over. Resetting per-key usage.")
+            self._quota_day = today
+            for key in self._used:
+                self._used[key] = 0
+                self._requests[key] = 0
+                self._forbidden[key] = 0
+            self._cooldown_until.clear()
+
+    def remaining(self, key: str) -> int:
+        return max(self.daily_quota - self._used[key], 0)
+
+    def acquire(self, cost: int = SEARCH_LIST_COST) -> Optional[str]:
+        """Reserves `cost` units on the key with the most headroom. Returns None if no key can afford it."""
+        now = datetime.now(timezone.utc)
+        self._roll_quota_day(now)
+        candidates = [
+            key for key in self._used
+            if self.remaining(key) >= cost and self._cooldown_until.get(key, now) <= now
+        ]
+        if not candidates:
+            return None
+        key = max(candidates, key=self.remaining)
+        self._used[key] += cost
+        self._requests[key] += 1
+        metrics.inc(metrics.YOUTUBE_QUOTA_UNITS, cost, _mask_key(key))
+        return key
+
+    def mark_exhausted(self, key: str, reason: str = "forbidden"):
+        """Puts a key on cool-down until the next quota reset after a 403."""
+        if key not in self._used:
+            return
+        until = next_quota_reset()
+        self._forbidden[key] += 1
+        metrics.inc(metrics.YOUTUBE_FORBIDDEN, 1, _mask_key(key))
+        self._cooldown_until[key] = until
+        logger.warning(f"API key {_mask_key(key)} returned 403 ({reason}). Cooling down until {until.isoformat()}.")
+
+    def total_remaining(self) -> int:
+        """Estimated quota units left today across all keys not on cool-down."""
+        now = datetime.now(timezone.utc)
+        self._roll_quota_day(now)
+        return sum(
+            self.remaining(key) for key in self._used
+            if self._cooldown_until.get(key, now) <= now
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Today's per-key usage and cool-downs, saved with the ingest checkpoint."""
+        self._roll_quota_day(datetime.now(timezone.utc))
+        return {
+            "quota_day": self._quota_day.isoformat(),
+            "keys": {
+                _key_id(key): {
+                    "used": self._used[key],
+                    "requests": self._requests[key],
+                    "forbidden": self._forbidden[key],
+                    "cooldown_until": self._cooldown_until[key].isoformat() if key in self._cooldown_until else None
+                }
+                for key in self._used
+            }
+        }
+
+    def restore(self, snapshot: Optional[Dict[str, Any]]):
+        """Takes over usage saved by an earlier leader or a backfill run, if it is from the current quota day.
+
+        Counts only ever go up, since this process's own usage may already be part of the saved snapshot.
+        """
+        self._roll_quota_day(datetime.now(timezone.utc))
+        if not snapshot or snapshot.get("quota_day") != self._quota_day.isoformat():
+            return
+        saved = snapshot.get("keys", {})
+        for key in self._used:
+            entry = saved.get(_key_id(key))
+            if not entry:
+                continue
+            self._used[key] = max(self._used[key], entry.get("used", 0))
+            self._requests[key] = max(self._requests[key], entry.get("requests", 0))
+            self._forbidden[key] = max(self._forbidden[key], entry.get("forbidden", 0))
+            if entry.get("cooldown_until"):
+                until = datetime.fromisoformat(entry["cooldown_until"])
+                if key not in self._cooldown_until or until > self._cooldown_until[key]:
+                    self._cooldown_until[key] = until
+
+    def states(self) -> List[ApiKeyState]:
+        now = datetime.now(timezone.utc)
+        self._roll_quota_day(now)
+        return [
+            ApiKeyState(
+                key=_mask_key(key),
+                used_units=self._used[key],
+                remaining_units=self.remaining(key),
+                requests=self._requests[key],
+                forbidden_count=self._forbidden[key],
+                cooldown_until=self._cooldown_until.get(key)
+            )
+            for key in self._used
+        ]
+
+
+if not YOUTUBE_API_KEYS:
     logger.error("FATAL: No YouTube API keys found in settings. Fetching will fail.")
-    api_key_cycler = cycle([None])
+key_scheduler = ApiKeyScheduler(YOUTUBE_API_KEYS, YOUTUBE_DAILY_QUOTA_PER_KEY)
 
-def get_next_api_key() -> Optional[str]:
-    """Gets the next available API key from the cycle."""
-    global current_api_key_index
-    key = next(api_key_cycler)
+def get_next_api_key(cost: int = SEARCH_LIST_COST) -> Optional[str]:
+    """Gets the API key with the most remaining quota, reserving `cost` units on it."""
+    key = key_scheduler.acquire(cost)
     if key:
-
-        current_api_key_index = (current_api_key_index + 1) % len(YOUTUBE_API_KEYS)
-        logger.debug(f"Using API Key index: {current_api_key_index}")
-        pass
+        logger.debug(f"Using API key {_mask_key(key)} ({key_scheduler.remaining(key)} units left)")
     else:
-         logger.warning("No valid API key available.")
+        logger.warning("No valid API key available (all keys exhausted or cooling down).")
     return key
 
-async def fetch_latest_videos(
+def _error_reason(response: httpx.Response) -> str:
+    """Extracts the first error reason (e.g. 'quotaExceeded') from a YouTube API error response."""
+    try:
+        errors = response.json().get("error", {}).get("errors", [])
+        return errors[0].get("reason", "forbidden") if errors else "forbidden"
+    except Exception:
+        return "forbidden"
+
+def _format_timestamp(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+class YouTubeFetchError(Exception):
+    """Raised by fetch_search_page(raise_on_error=True) when a page could not be fetched."""
+
+@metrics.timed(metrics.YOUTUBE_REQUEST_SECONDS)
+async def fetch_search_page(
     search_query: str,
     api_key: str,
-    published_after: Optional[datetime] = None
-) -> List[Video]:
-    """Fetches latest videos from YouTube API for a given query."""
+    published_after: Optional[datetime] = None,
+    published_before: Optional[datetime] = None,
+    page_token: Optional[str] = None,
+    raise_on_error: bool = False
+) -> Tuple[List[Video], Optional[str]]:
+    """Fetches one page of search results (newest first). Returns the videos and the nextPageToken, if any.
+
+    Errors are logged and returned as an empty page, unless `raise_on_error` is set, in which case a
+    YouTubeFetchError is raised so callers can tell a failed page from an empty one.
+    """
     if not api_key:
         logger.error("Cannot fetch YouTube videos: No API key provided.")
-        return []
+        return [], None
 
     YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3/search"
     params = {
@@ -54,64 +268,170 @@ async def fetch_latest_videos(
         if published_after.tzinfo is None:
              published_after = published_after.replace(tzinfo=timezone.utc)
         published_after_buffered = published_after + timedelta(seconds=1)
-        params["publishedAfter"] = published_after_buffered.isoformat(timespec='seconds').replace('+00:00', 'Z')
+        params["publishedAfter"] = _format_timestamp(published_after_buffered)
         logger.info(f"Fetching videos published after: {params['publishedAfter']}")
     else:
         logger.info("Fetching initial set of videos (no publishedAfter timestamp).")
+    if published_before:
+        params["publishedBefore"] = _format_timestamp(published_before)
+    if page_token:
+        params["pageToken"] = page_token
 
 
     fetched_videos: List[Video] = []
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            response = await client.get(YOUTUBE_API_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            items = data.get("items", [])
-            if not items:
-                logger.info(f"No new videos found for query '{search_query}' since last check.")
-                return []
-
-            logger.info(f"Fetched {len(items)} video items from YouTube API.")
-
-            for item in items:
-                snippet = item.get("snippet", {})
-                video_id = item.get("id", {}).get("videoId")
-                published_at_str = snippet.get("publishedAt")
-                thumbnails_data = snippet.get("thumbnails", {})
-
-                if not video_id or not published_at_str:
-                    logger.warning(f"Skipping item due to missing videoId or publishedAt: {item}")
-                    continue
-
-                try:
-                    # Parse the timestamp string into a datetime object
-                    published_dt = datetime.fromisoformat(published_at_str.replace('Z', '+00:00'))
-
-                    video = Video(
-                        video_id=video_id,
-                        title=snippet.get("title", "No Title"),
-                        description=snippet.get("description", "No Description"),
-                        published_at=published_dt,
-                        thumbnails=thumbnails_data["medium"]['url']
-                    )
-                    fetched_videos.append(video)
-                except Exception as e:
-                    logger.error(f"Error parsing video data for ID {video_id}: {e}", exc_info=True)
-                    continue
-
-            return fetched_videos
+        client = get_http_client()
+        response = await client.get(YOUTUBE_API_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+        next_page_token = data.get("nextPageToken")
+
+        items = data.get("items", [])
+        if not items:
+            logger.info(f"No new videos found for query '{search_query}' since last check.")
+            return [], None
+
+        logger.info(f"Fetched {len(items)} video items from YouTube API.")
+
+        for item in items:
+            snippet = item.get("snippet", {})
+            video_id = item.get("id", {}).get("videoId")
+            published_at_str = snippet.get("publishedAt")
+            thumbnails_data = snippet.get("thumbnails", {})
+
+            if not video_id or not published_at_str:
+                logger.warning(f"Skipping item due to missing videoId or publishedAt: {item}")
+                continue
+
+            try:
+                # Parse the timestamp string into a datetime object
+                published_dt = datetime.fromisoformat(published_at_str.replace('Z', '+00:00'))
+
+                video = Video(
+                    video_id=video_id,
+                    title=snippet.get("title", "No Title"),
+                    description=snippet.get("description", "No Description"),
+                    published_at=published_dt,
+                    thumbnails=thumbnails_data["medium"]['url'],
+                    topic=search_query
+                )
+                fetched_videos.append(video)
+            except Exception as e:
+                logger.error(f"Error parsing video data for ID {video_id}: {e}", exc_info=True)
+                continue
+
+        return fetched_videos, next_page_token
 
     except httpx.HTTPStatusError as e:
 
         if e.response.status_code == 403:
             logger.warning(f"YouTube API quota likely exceeded for the current key or access forbidden. Status: {e.response.status_code}. Response: {e.response.text}")
+            key_scheduler.mark_exhausted(api_key, _error_reason(e.response))
         else:
             logger.error(f"HTTP error fetching YouTube videos: {e.response.status_code} - {e.response.text}", exc_info=True)
-        return []
+        if raise_on_error:
+            raise YouTubeFetchError(f"HTTP {e.response.status_code}") from e
+        return [], None
     except httpx.RequestError as e:
         logger.error(f"Network error fetching YouTube videos: {e}", exc_info=True)
-        return []
+        if raise_on_error:
+            raise YouTubeFetchError(str(e)) from e
+        return [], None
     except Exception as e:
         logger.error(f"Unexpected error fetching/processing YouTube videos: {e}", exc_info=True)
-        return []
\ No newline at end of file
+        if raise_on_error:
+            raise YouTubeFetchError(str(e)) from e
+        return [], None
+
+async def fetch_latest_videos(
+    search_query: str,
+    api_key: str,
+    published_after: Optional[datetime] = None,
+    published_before: Optional[datetime] = None
+) -> List[Video]:
+    """Fetches latest videos from YouTube API for a given query (first result page only)."""
+    videos, _ = await fetch_search_page(search_query, api_key, published_after, published_before)
+    return videos
+
+async def iter_video_pages(
+    search_query: str,
+    published_after: Optional[datetime] = None,
+    published_before: Optional[datetime] = None,
+    max_pages: int = YOUTUBE_MAX_PAGES_PER_FETCH,
+    max_units: int = YOUTUBE_MAX_UNITS_PER_FETCH
+) -> AsyncIterator[Tuple[List[Video], Optional[str]]]:
+    """Follows nextPageToken newest-first, yielding each page of videos with its nextPageToken as soon as it arrives.
+
+    Every page is paid for with the key that has the most headroom at that moment. The walk stops at the
+    last page, when `max_pages` or `max_units` (0 = no unit cap) is reached, or when no key has quota left;
+    the walk reached its end only if the last token yielded is None. A page that fails raises YouTubeFetchError.
+    """
+    page_token: Optional[str] = None
+    pages = 0
+    units = 0
+    while True:
+        if pages >= max_pages or (max_units and units + SEARCH_LIST_COST > max_units):
+            logger.info(f"Page budget reached for query '{search_query}' after {pages} page(s) ({units} units). The rest of the walk continues next poll.")
+            return
+        api_key = get_next_api_key()
+        if not api_key:
+            return
+        videos, page_token = await fetch_search_page(
+            search_query, api_key, published_after, published_before, page_token, raise_on_error=True
+        )
+        pages += 1
+        units += SEARCH_LIST_COST
+        yield videos, page_token
+        if not page_token:
+            return
+
+_DURATION_RE = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+def parse_duration(value: Optional[str]) -> Optional[int]:
+    """Converts an ISO 8601 duration such as 'PT1H2M3S' (as returned by contentDetails) to seconds."""
+    match = _DURATION_RE.match(value or "")
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(part) if part else 0 for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value is not None else None
+
+@metrics.timed(metrics.YOUTUBE_REQUEST_SECONDS)
+async def fetch_video_stats(video_ids: List[str], api_key: str) -> Optional[Dict[str, VideoStats]]:
+    """Fetches statistics and duration for up to 50 videos with one videos.list call (1 quota unit).
+
+    Returns stats by video ID; deleted or private videos are simply absent. Returns None if the call failed.
+    """
+    if not video_ids:
+        return {}
+    YOUTUBE_VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+    params = {
+        "part": "statistics,contentDetails",
+        "id": ",".join(video_ids[:50]),
+        "key": api_key,
+        "maxResults": 50
+    }
+    try:
+        response = await get_http_client().get(YOUTUBE_VIDEOS_URL, params=params)
+        response.raise_for_status()
+        stats: Dict[str, VideoStats] = {}
+        for item in response.json().get("items", []):
+            statistics = item.get("statistics", {})
+            stats[item["id"]] = VideoStats(
+                video_id=item["id"],
+                view_count=_optional_int(statistics.get("viewCount")),
+                like_count=_optional_int(statistics.get("likeCount")),
+                duration_seconds=parse_duration(item.get("contentDetails", {}).get("duration"))
+            )
+        return stats
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 403:
+            key_scheduler.mark_exhausted(api_key, _error_reason(e.response))
+        else:
+            logger.error(f"HTTP error fetching video stats: {e.response.status_code} - {e.response.text}", exc_info=True)
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching video stats for {len(video_ids)} videos: {e}", exc_info=True)
+        return None
@@ -0,0 +1,100 @@
+"""Micro-benchmark: validated vs pass-through response path for /videos and /search.
+
+The "validated" path is what the endpoints used to do: Video.model_validate on every _source, then
+FastAPI validating and serializing the VideoListResponse through response_model. The "fast" path is
+what they do now: stored documents are encoded with orjson and returned as a Response.
+
+Both paths are served by a throwaway FastAPI app and driven in-process over ASGI, so the numbers include
+routing and response rendering but no network or Elasticsearch.
+
+    python -m benchmarks.bench_serialization [--iterations 200]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from app.main import video_list_response
+from app.pydantic_models import Video, VideoListResponse
+
+
+def make_documents(count: int) -> List[Dict[str, Any]]:
+    """Builds _source documents shaped like the ones bulk_index_videos writes."""
+    now = datetime.now(timezone.utc)
+    docs = []
+    for i in range(count):
+        video = Video(
+            video_id=f"vid{i:08d}",
+            title=f"IPL 2025 match {i} full highlights | CSK vs MI #shorts #cricket",
+            description="Mumbai Indians vs Chennai Super Kings full match highlights, every boundary and wicket. " * 2,
+            published_at=now - timedelta(seconds=37 * i),
+            thumbnails=f"https://i.ytimg.com/vi/vid{i:08d}/mqdefault.jpg",
+            topic="ipl 2025"
+        )
+        docs.append(video.model_dump(mode='json'))
+    return docs
+
+
+def build_app(docs: List[Dict[str, Any]]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=VideoListResponse)
+    async def validated():
+        videos = [Video.model_validate(doc) for doc in docs]
+        return VideoListResponse(total=len(docs), page=1, size=len(videos), videos=videos)
+
+    @app.get("/fast", response_model=VideoListResponse)
+    async def fast():
+        return video_list_response(docs, len(docs), 1, None)
+
+    return app
+
+
+async def time_path(client: httpx.AsyncClient, path: str, iterations: int) -> List[float]:
+    for _ in range(min(iterations, 20)): # warm-up
+        (await client.get(path)).raise_for_status()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def run(sizes: List[int], iterations: int):
+    print(f"{'size':>6} {'path':>10} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'body KB':>8}")
+    for size in sizes:
+        docs = make_documents(size)
+        app = build_app(docs)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Both paths must produce the same JSON document
+            assert (await client.get("/validated")).json() == (await client.get("/fast")).json()
+            results = {}
+            for path in ("validated", "fast"):
+                timings = await time_path(client, f"/{path}", iterations)
+                body_kb = len((await client.get(f"/{path}")).content) / 1024
+                p99 = statistics.quantiles(timings, n=100)[98]
+                results[path] = statistics.median(timings)
+                print(f"{size:>6} {path:>10} {statistics.median(timings):>9.3f} {p99:>9.3f} {statistics.fmean(timings):>9.3f} {body_kb:>8.1f}")
+            print(f"{size:>6} {'speedup':>10} {results['validated'] / results['fast']:>9.2f}x")
+
+
+def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 1000], help="documents per response")
+    parser.add_argument("--iterations", type=int, default=200, help="timed requests per path and size")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
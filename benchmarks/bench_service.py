@@ -0,0 +1,282 @@
+"""End-to-end benchmark of the fetcher and the read endpoints against local stand-ins.
+
+The real `fetcher.periodic_fetch` loop (adaptive scheduler, key scheduler, write-behind queue, enrichment)
+ingests from FakeYouTube into FakeElasticsearch for `--duration` seconds. Then the real FastAPI app is
+driven over ASGI by `--concurrency` clients hitting /videos (get_videos_paginated) and /search
+(search_videos). No network or Elasticsearch is needed.
+
+Reported: ingest throughput (videos indexed per second until the last bulk write), fetch cycle latency,
+per-endpoint p50/p99 and requests per second, and per request the CPU time of the app ("app cpu ms") and
+of FakeElasticsearch ("double cpu ms"). Everything shares one event loop, so with --concurrency above 1
+a request's latency includes waiting on other requests and on the double; compare the CPU columns, not
+latency minus double time, to see the app's own cost. Use --json to save results for before/after comparisons.
+
+    python -m benchmarks.bench_service [--duration 10] [--requests 2000] [--concurrency 16] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import FakeElasticsearch, FakeYouTube
+
+
+def configure_environment(args: argparse.Namespace, workdir: str):
+    """Settings are read when app modules are imported, so they are set before the first import."""
+    os.environ.update({
+        "YOUTUBE_API_KEYS": ",".join(f"bench-key-{i}" for i in range(args.keys)),
+        "YOUTUBE_DAILY_QUOTA_PER_KEY": str(args.quota_per_key),
+        "SEARCH_QUERIES": ",".join(args.topics),
+        "FETCH_INTERVAL_SECONDS": "1",
+        "POLL_MIN_INTERVAL_SECONDS": "1",
+        "INGEST_STATE_PATH": os.path.join(workdir, "ingest_state.json"),
+        "WRITE_JOURNAL_PATH": os.path.join(workdir, "write_journal.ndjson"),
+        "ENRICH_FLUSH_SECONDS": "1",
+        "HOT_TIER_SIZE": str(args.hot_tier_size),
+        "SEARCH_CACHE_MAX_ENTRIES": "1024" if args.search_cache else "0",
+    })
+
+
+def percentiles(timings: List[float]) -> Dict[str, float]:
+    if len(timings) < 2:
+        value = timings[0] if timings else 0.0
+        return {"p50": value, "p99": value, "mean": value}
+    return {
+        "p50": statistics.median(timings),
+        "p99": statistics.quantiles(timings, n=100)[98],
+        "mean": statistics.fmean(timings)
+    }
+
+
+async def bench_ingest(args: argparse.Namespace, es: FakeElasticsearch, youtube: FakeYouTube) -> Dict[str, Any]:
+    from app import fetcher, write_queue
+
+    fetch_timings: List[float] = []
+    cycle_timings: List[float] = []
+    cycle_started: Optional[float] = None
+
+    original_fetch_topic = fetcher.fetch_topic
+    async def timed_fetch_topic(topic, semaphore):
+        start = time.perf_counter()
+        try:
+            return await original_fetch_topic(topic, semaphore)
+        finally:
+            fetch_timings.append((time.perf_counter() - start) * 1000)
+    fetcher.fetch_topic = timed_fetch_topic
+
+    # A cycle runs from due_topics() returning work to the scheduler being asked how long to sleep
+    scheduler = fetcher.poll_scheduler
+    original_due_topics, original_seconds_until_next = scheduler.due_topics, scheduler.seconds_until_next
+    def due_topics():
+        nonlocal cycle_started
+        topics = original_due_topics()
+        if topics:
+            cycle_started = time.perf_counter()
+        return topics
+    def seconds_until_next():
+        nonlocal cycle_started
+        if cycle_started is not None:
+            cycle_timings.append((time.perf_counter() - cycle_started) * 1000)
+            cycle_started = None
+        return original_seconds_until_next()
+    scheduler.due_topics, scheduler.seconds_until_next = due_topics, seconds_until_next
+
+    started = time.perf_counter()
+    task = asyncio.create_task(fetcher.periodic_fetch())
+    await asyncio.sleep(args.duration)
+    # Let the writer drain so the run ends with everything indexed rather than journaled
+    writer = write_queue.writer
+    deadline = time.perf_counter() + 30
+    while (writer.stats()["queued_batches"] or writer._held) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    fetcher.shutdown_event.set()
+    await task
+
+    fetcher.fetch_topic = original_fetch_topic
+    scheduler.due_topics, scheduler.seconds_until_next = original_due_topics, original_seconds_until_next
+
+    indexed = (await es.count(index=os.environ.get("ELASTICSEARCH_INDEX", "youtube_videos")))["count"]
+    ingest_seconds = (es.last_write_at - started) if es.last_write_at else 0.0
+    return {
+        "videos_indexed": indexed,
+        "ingest_seconds": ingest_seconds,
+        "videos_per_second": indexed / ingest_seconds if ingest_seconds else 0.0,
+        "fetch_cycles": len(cycle_timings),
+        "cycle_ms": percentiles(cycle_timings),
+        "topic_fetch_ms": percentiles(fetch_timings),
+        "youtube_calls": dict(youtube.calls),
+        "youtube_units": sum(youtube.used_units.values()),
+        "es_calls": dict(es.calls),
+        "write_queue": writer.stats()
+    }
+
+
+async def seed_corpus(target: int, topics: List[str]):
+    """Tops the index up to `target` documents through the real bulk write path."""
+    from app import es_utils
+    from app.pydantic_models import Video
+
+    existing = (await es_utils.get_es_client().count(index=es_utils.ELASTICSEARCH_INDEX))["count"]
+    now = datetime.now(timezone.utc)
+    batch: List[Video] = []
+    for i in range(max(target - existing, 0)):
+        topic = topics[i % len(topics)]
+        batch.append(Video(
+            video_id=f"seed{i:08d}",
+            title=f"{topic} match {i} full highlights",
+            description=f"Seeded {topic} video {i} with boundaries, wickets and the final over.",
+            published_at=now - timedelta(days=1, seconds=13 * i),
+            thumbnails=f"https://i.ytimg.com/vi/seed{i:08d}/mqdefault.jpg",
+            topic=topic
+        ))
+        if len(batch) == 1000:
+            await es_utils.bulk_index_videos(batch)
+            batch = []
+    if batch:
+        await es_utils.bulk_index_videos(batch)
+
+
+async def bench_endpoint(
+    client: httpx.AsyncClient, es: FakeElasticsearch, paths: List[str], requests: int, concurrency: int
+) -> Dict[str, Any]:
+    timings: List[float] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(paths[i % len(paths)])
+
+    async def run_client():
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    busy_before = es.busy_seconds
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    double_seconds = es.busy_seconds - busy_before
+    return {
+        "requests": requests,
+        "rps": requests / elapsed,
+        "latency_ms": percentiles(timings),
+        "app_cpu_ms_per_request": (time.process_time() - cpu_before - double_seconds) * 1000 / requests,
+        "double_cpu_ms_per_request": double_seconds * 1000 / requests
+    }
+
+
+async def bench_queries(args: argparse.Namespace, es: FakeElasticsearch) -> Dict[str, Any]:
+    from app import hot_tier
+    from app.main import app
+
+    await seed_corpus(args.corpus, args.topics)
+    if args.hot_tier_size:
+        await hot_tier.feed.warm()
+
+    rng = random.Random(7)
+    video_paths = [f"/videos?page={rng.randint(1, 10)}&size=10" for _ in range(200)]
+    words = args.topics + ["highlights", "match", "final over", "wickets", "full highlights", "video 12"]
+    search_paths = [f"/search?q={rng.choice(words).replace(' ', '%20')}&size=10" for _ in range(200)]
+
+    transport = httpx.ASGITransport(app=app) # no lifespan: the fakes are already wired in
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in video_paths[:20] + search_paths[:20]: # warm-up
+            (await client.get(path)).raise_for_status()
+        return {
+            "corpus": (await es.count(index=os.environ.get("ELASTICSEARCH_INDEX", "youtube_videos")))["count"],
+            "/videos": await bench_endpoint(client, es, video_paths, args.requests, args.concurrency),
+            "/search": await bench_endpoint(client, es, search_paths, args.requests, args.concurrency)
+        }
+
+
+def print_report(results: Dict[str, Any]):
+    ingest = results.get("ingest")
+    if ingest:
+        print(f"ingest: {ingest['videos_indexed']} videos in {ingest['ingest_seconds']:.2f}s "
+              f"({ingest['videos_per_second']:.1f}/s), {ingest['fetch_cycles']} cycles, "
+              f"{ingest['youtube_units']} YouTube units, ES calls {ingest['es_calls']}")
+        print(f"{'':>14} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+        for name in ("cycle_ms", "topic_fetch_ms"):
+            stats = ingest[name]
+            print(f"{name:>14} {stats['p50']:>9.2f} {stats['p99']:>9.2f} {stats['mean']:>9.2f}")
+    queries = results.get("queries")
+    if queries:
+        print(f"\nqueries over {queries['corpus']} documents")
+        print(f"{'endpoint':>10} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'app cpu ms':>11} {'double cpu ms':>14}")
+        for endpoint in ("/videos", "/search"):
+            stats = queries[endpoint]
+            latency = stats["latency_ms"]
+            print(f"{endpoint:>10} {stats['rps']:>9.1f} {latency['p50']:>9.2f} {latency['p99']:>9.2f} "
+                  f"{stats['app_cpu_ms_per_request']:>11.2f} {stats['double_cpu_ms_per_request']:>14.2f}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app import es_utils, yt_utils
+
+    es = FakeElasticsearch(latency_ms=args.es_latency_ms)
+    youtube = FakeYouTube(
+        args.topics,
+        videos_per_minute=args.arrivals_per_minute,
+        backlog=args.backlog,
+        latency_ms=args.youtube_latency_ms,
+        page_size=args.page_size,
+        quota_per_key=args.quota_per_key
+    )
+    es_utils.es_client = es
+    yt_utils.http_client = youtube.client()
+    await es_utils.ensure_index_exists()
+    await es_utils.ensure_meta_index_exists()
+
+    results: Dict[str, Any] = {"args": vars(args)}
+    try:
+        if args.duration > 0:
+            results["ingest"] = await bench_ingest(args, es, youtube)
+        if args.requests > 0:
+            results["queries"] = await bench_queries(args, es)
+    finally:
+        await yt_utils.close_http_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", nargs="+", default=["cricket", "football", "tennis", "chess"])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds the fetch loop runs (0 skips ingest)")
+    parser.add_argument("--backlog", type=int, default=1000, help="videos per topic published before the run")
+    parser.add_argument("--arrivals-per-minute", type=float, default=120.0, help="new videos per topic per minute")
+    parser.add_argument("--youtube-latency-ms", type=float, default=50.0)
+    parser.add_argument("--page-size", type=int, default=50, help="maximum results per search.list page")
+    parser.add_argument("--keys", type=int, default=3)
+    parser.add_argument("--quota-per-key", type=int, default=10000)
+    parser.add_argument("--es-latency-ms", type=float, default=1.0)
+    parser.add_argument("--corpus", type=int, default=5000, help="documents in the index for the query phase")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint (0 skips queries)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hot-tier-size", type=int, default=0, help="serve first /videos pages from the hot tier")
+    parser.add_argument("--search-cache", action="store_true", help="enable the /search result cache")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="yt-bench-") as workdir:
+        configure_environment(args, workdir)
+        results = asyncio.run(run(args))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
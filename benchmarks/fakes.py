@@ -0,0 +1,727 @@
+"""Local stand-ins for the YouTube Data API and Elasticsearch, used by the benchmarks.
+
+FakeYouTube serves search.list and videos.list through an httpx.MockTransport. Each topic gets a
+synthetic stream of videos arriving at a fixed rate. The stand-in also models per-call latency, page size
+and per-key daily quotas (403 quotaExceeded once a key is spent).
+
+FakeElasticsearch is an in-memory double for the subset of AsyncElasticsearch that app.es_utils uses:
+search with the query/sort/search_after/point-in-time shapes the app sends, bulk (through the real
+async_streaming_bulk helper), single-document get/index/create/delete, and the index/alias/template calls.
+Relevance is approximated by term overlap, and every call can be delayed by a fixed latency.
+
+Like a real index, each index keeps its documents ordered by (published_at, _id) and its text fields
+tokenized into postings when written. Newest-first searches bisect to their search_after/from position
+and stop once the page is full; multi_match only scores the documents holding one of its terms. A
+point-in-time keeps the documents as they were, but finds multi_match candidates through the live
+postings. CPU time spent inside the double is accounted in `busy_seconds`. It runs on the event loop,
+so it delays every request in flight, not only its own.
+"""
+import asyncio
+import bisect
+import collections
+import fnmatch
+import heapq
+import itertools
+import json
+import math
+import time
+from datetime import datetime, timezone
+from functools import cmp_to_key
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+import httpx
+from elastic_transport import ApiResponseMeta, HttpHeaders, JsonSerializer, NodeConfig
+from elasticsearch import BadRequestError, ConflictError, NotFoundError
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class FakeYouTube:
+    """search.list / videos.list stand-in. Topic `t` publishes a video every 60/videos_per_minute seconds."""
+
+    SEARCH_COST = 100
+    VIDEOS_COST = 1
+
+    def __init__(
+        self,
+        topics: List[str],
+        videos_per_minute: float = 30.0,
+        backlog: int = 1000,
+        latency_ms: float = 50.0,
+        page_size: int = 50,
+        quota_per_key: int = 10000,
+        max_results_per_query: int = 500
+    ):
+        self.topics = topics
+        self.interval = 60.0 / videos_per_minute
+        self.latency = latency_ms / 1000
+        self.page_size = page_size
+        self.quota_per_key = quota_per_key
+        self.max_results_per_query = max_results_per_query # YouTube stops paging deep result sets
+        # video n of a topic is published at origin + n * interval; `backlog` videos already exist now
+        self.origin = time.time() - backlog * self.interval
+        self.used_units: Dict[str, int] = {}
+        self.calls = {"search": 0, "videos": 0, "forbidden": 0}
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    def _published_at(self, n: int) -> float:
+        return self.origin + n * self.interval
+
+    def _newest_index_before(self, timestamp: float) -> int:
+        """Highest n published strictly before `timestamp` (and not in the future), or -1."""
+        limit = min(timestamp, time.time())
+        n = math.ceil((limit - self.origin) / self.interval) - 1
+        return n if n >= 0 else -1
+
+    def _oldest_index_after(self, timestamp: float) -> int:
+        """Lowest n published at or after `timestamp` (YouTube's publishedAfter is inclusive)."""
+        return max(math.ceil((timestamp - self.origin) / self.interval), 0)
+
+    def _charge(self, key: str, cost: int) -> bool:
+        used = self.used_units.get(key, 0)
+        if used + cost > self.quota_per_key:
+            self.calls["forbidden"] += 1
+            return False
+        self.used_units[key] = used + cost
+        return True
+
+    def _forbidden(self) -> httpx.Response:
+        return httpx.Response(403, json={"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}]}})
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = {k: v[0] for k, v in parse_qs(request.url.query.decode()).items()}
+        if request.url.path.endswith("/search"):
+            return self._search(params)
+        if request.url.path.endswith("/videos"):
+            return self._videos(params)
+        return httpx.Response(404)
+
+    def _video_id(self, topic_no: int, n: int) -> str:
+        return f"t{topic_no}v{n:09d}"
+
+    def _search(self, params: Dict[str, str]) -> httpx.Response:
+        if not self._charge(params.get("key", ""), self.SEARCH_COST):
+            return self._forbidden()
+        self.calls["search"] += 1
+        topic = params.get("q", "")
+        if topic not in self.topics:
+            return httpx.Response(200, json={"items": []})
+        topic_no = self.topics.index(topic)
+        before = _parse_time(params["publishedBefore"]).timestamp() if "publishedBefore" in params else time.time()
+        after = _parse_time(params["publishedAfter"]).timestamp() if "publishedAfter" in params else self.origin
+        newest = self._newest_index_before(before)
+        oldest = self._oldest_index_after(after)
+        available = min(newest - oldest + 1, self.max_results_per_query) if newest >= oldest else 0
+
+        offset = int(params.get("pageToken", 0))
+        size = min(int(params.get("maxResults", 5)), self.page_size)
+        items = []
+        for n in range(newest - offset, max(newest - offset - size, newest - available), -1):
+            video_id = self._video_id(topic_no, n)
+            items.append({
+                "id": {"kind": "youtube#video", "videoId": video_id},
+                "snippet": {
+                    "publishedAt": _iso(datetime.fromtimestamp(self._published_at(n), tz=timezone.utc)),
+                    "title": f"{topic} video {n} full highlights",
+                    "description": f"Synthetic {topic} upload number {n} for benchmarking.",
+                    "thumbnails": {"medium": {"url": f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"}}
+                }
+            })
+        body: Dict[str, Any] = {"items": items}
+        if offset + size < available:
+            body["nextPageToken"] = str(offset + size)
+        return httpx.Response(200, json=body)
+
+    def _videos(self, params: Dict[str, str]) -> httpx.Response:
+        if not self._charge(params.get("key", ""), self.VIDEOS_COST):
+            return self._forbidden()
+        self.calls["videos"] += 1
+        items = []
+        for video_id in params.get("id", "").split(","):
+            if not video_id:
+                continue
+            n = int(video_id.split("v", 1)[1])
+            items.append({
+                "id": video_id,
+                "statistics": {"viewCount": str(n * 37 % 100000), "likeCount": str(n * 7 % 5000)},
+                "contentDetails": {"duration": f"PT{n % 59 + 1}M{n % 60}S"}
+            })
+        return httpx.Response(200, json={"items": items})
+
+
+def _api_error(cls, status: int, message: str):
+    meta = ApiResponseMeta(
+        status=status, http_version="1.1", headers=HttpHeaders(), duration=0.0, node=NodeConfig("http", "localhost", 9200)
+    )
+    return cls(message, meta, {"error": {"type": message}, "status": status})
+
+
+class _Response(dict):
+    """Dict that also exposes .body, like the client's ObjectApiResponse."""
+
+    @property
+    def body(self) -> Dict[str, Any]:
+        return self
+
+
+class _Serializers:
+    def get_serializer(self, mimetype: str) -> JsonSerializer:
+        return JsonSerializer()
+
+
+class _Transport:
+    serializers = _Serializers()
+
+
+def _field_value(source: Dict[str, Any], field: str) -> Any:
+    # Sub-fields such as title.suggest index the parent's value
+    return source.get(field.split('.', 1)[0])
+
+def _sort_value(doc: "_Doc", field: str, score: float) -> Any:
+    if field == "_score":
+        return score
+    if field == "_shard_doc":
+        return doc.seq
+    value = _field_value(doc.source, field)
+    if field in ("published_at", "indexed_at", "stats_updated_at") and isinstance(value, str):
+        return int(_parse_time(value).timestamp() * 1000)
+    return value
+
+def _tokens(text: Any) -> List[str]:
+    return "".join(ch.lower() if ch.isalnum() else " " for ch in str(text or "")).split()
+
+# Fields tokenized into postings at write time; multi_match over any other field tokenizes per document
+TEXT_FIELDS = ("title", "description")
+
+
+class _Doc:
+    __slots__ = ("id", "source", "seq", "index", "seq_no", "key", "terms")
+
+    def __init__(self, doc_id: str, source: Dict[str, Any], seq: int, index: str, seq_no: int):
+        self.id = doc_id
+        self.source = source
+        self.seq = seq
+        self.index = index
+        self.seq_no = seq_no
+        published_at = _sort_value(self, "published_at", 0.0)
+        # Documents without published_at (meta documents) sort below every video
+        self.key: Tuple[int, str] = (published_at if isinstance(published_at, int) else -1, doc_id)
+        self.terms: Dict[str, FrozenSet[str]] = {field: frozenset(_tokens(source.get(field))) for field in TEXT_FIELDS}
+
+
+class _Shard:
+    """One index: documents by _id, their keys in (published_at, _id) order, and per-field postings."""
+
+    def __init__(self):
+        self.docs: Dict[str, _Doc] = {}
+        self.order: List[Tuple[int, str]] = []
+        self.postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in TEXT_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.docs
+
+    def get(self, doc_id: str) -> Optional[_Doc]:
+        return self.docs.get(doc_id)
+
+    def put(self, doc: _Doc) -> Optional[_Doc]:
+        existing = self.remove(doc.id)
+        self.docs[doc.id] = doc
+        bisect.insort(self.order, doc.key)
+        for field, terms in doc.terms.items():
+            postings = self.postings[field]
+            for term in terms:
+                postings.setdefault(term, set()).add(doc.id)
+        return existing
+
+    def remove(self, doc_id: str) -> Optional[_Doc]:
+        doc = self.docs.pop(doc_id, None)
+        if doc is not None:
+            del self.order[bisect.bisect_left(self.order, doc.key)]
+            for field, terms in doc.terms.items():
+                postings = self.postings[field]
+                for term in terms:
+                    ids = postings[term]
+                    ids.discard(doc.id)
+                    if not ids:
+                        del postings[term]
+        return doc
+
+    def descending(self, before: Optional[Tuple[Any, ...]]) -> Iterator[Tuple[Tuple[int, str], _Doc]]:
+        """(key, doc) newest first, starting below `before` if given."""
+        position = len(self.order) if before is None else bisect.bisect_left(self.order, before)
+        for i in range(position - 1, -1, -1):
+            key = self.order[i]
+            yield key, self.docs[key[1]]
+
+    def ascending(self, after: Optional[Tuple[Any, ...]]) -> Iterator[Tuple[Tuple[int, str], _Doc]]:
+        """(key, doc) oldest first, starting above `after` if given."""
+        position = 0 if after is None else bisect.bisect_right(self.order, after)
+        for i in range(position, len(self.order)):
+            key = self.order[i]
+            yield key, self.docs[key[1]]
+
+    def scores(self, fields: Set[str], terms: List[str], prefix: bool) -> Dict[str, float]:
+        """multi_match scores from the postings: 1 per query term any of `fields` holds, and 0.5 for a last
+        term (with `prefix`) that is only the start of one. Documents scoring 0 are left out."""
+        scores: Dict[str, float] = collections.Counter()
+        for i, term in enumerate(terms):
+            ids: Set[str] = set()
+            for field in fields:
+                ids.update(self.postings[field].get(term, ()))
+            scores.update(ids)
+            if prefix and i == len(terms) - 1:
+                extended: Set[str] = set()
+                for field in fields:
+                    for candidate, term_ids in self.postings[field].items():
+                        if candidate.startswith(term):
+                            extended.update(term_ids)
+                for doc_id in extended - ids:
+                    scores[doc_id] += 0.5
+        return scores
+
+
+class _FakeIndices:
+    def __init__(self, es: "FakeElasticsearch"):
+        self.es = es
+
+    async def exists(self, index: str) -> bool:
+        await self.es._delay()
+        return index in self.es._indices or index in self.es.aliases
+
+    async def exists_alias(self, name: str) -> bool:
+        await self.es._delay()
+        return bool(self.es.aliases.get(name))
+
+    async def get_alias(self, name: Optional[str] = None, index: Optional[str] = None) -> _Response:
+        await self.es._delay()
+        indices = self.es.aliases.get(name, set()) if name else set(self.es._indices)
+        if index:
+            indices = {i for i in indices if fnmatch.fnmatch(i, index)}
+        if not indices:
+            raise _api_error(NotFoundError, 404, "aliases_not_found_exception")
+        return _Response({i: {"aliases": {name: {}}} for i in indices})
+
+    async def create(self, index: str, **kwargs):
+        await self.es._delay()
+        self.es._create_index(index, explicit=True)
+
+    async def delete(self, index: str, **kwargs):
+        await self.es._delay()
+        if index not in self.es._indices:
+            raise _api_error(NotFoundError, 404, "index_not_found_exception")
+        del self.es._indices[index]
+        for members in self.es.aliases.values():
+            members.discard(index)
+
+    async def put_mapping(self, **kwargs):
+        await self.es._delay()
+
+    async def put_index_template(self, name: str, index_patterns: List[str], template: Dict[str, Any], **kwargs):
+        await self.es._delay()
+        self.es.templates[name] = (index_patterns, list(template.get("aliases", {})))
+
+    async def update_aliases(self, actions: List[Dict[str, Any]]):
+        await self.es._delay()
+        for action in actions:
+            (kind, spec), = action.items()
+            if kind == "remove_index":
+                del self.es._indices[spec["index"]]
+                continue
+            targets = [i for i in self.es._indices if fnmatch.fnmatch(i, spec["index"])]
+            for target in targets:
+                members = self.es.aliases.setdefault(spec["alias"], set())
+                (members.add if kind == "add" else members.discard)(target)
+
+
+class FakeElasticsearch:
+    """In-memory AsyncElasticsearch double; see the module docstring for what it covers."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self._indices: Dict[str, _Shard] = {}
+        self.indices = _FakeIndices(self) # the client's `indices` namespace
+        self.aliases: Dict[str, Set[str]] = {}
+        self.templates: Dict[str, Tuple[List[str], List[str]]] = {}
+        self.transport = _Transport()
+        self._client_meta = ()
+        self._pits: Dict[str, Dict[str, Dict[str, _Doc]]] = {} # pit id -> index -> documents as of opening
+        self._seq = itertools.count()
+        self.calls: Dict[str, int] = {}
+        self.busy_seconds = 0.0 # CPU time spent evaluating requests inside the double
+        self.last_write_at: Optional[float] = None
+
+    # client plumbing
+    def options(self, **kwargs) -> "FakeElasticsearch":
+        return self
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def ping(self) -> bool:
+        await self._delay()
+        return True
+
+    async def close(self):
+        pass
+
+    # storage
+    def _create_index(self, index: str, explicit: bool = False):
+        if index in self._indices:
+            if explicit:
+                raise _api_error(BadRequestError, 400, "resource_already_exists_exception")
+            return
+        self._indices[index] = _Shard()
+        for patterns, aliases in self.templates.values():
+            if any(fnmatch.fnmatch(index, pattern) for pattern in patterns):
+                for alias in aliases:
+                    self.aliases.setdefault(alias, set()).add(index)
+
+    def _resolve(self, index: Optional[str]) -> List[str]:
+        if index is None:
+            return list(self._indices)
+        if index in self.aliases:
+            return [i for i in self.aliases[index] if i in self._indices]
+        if index in self._indices:
+            return [index]
+        matched = [i for i in self._indices if fnmatch.fnmatch(i, index)]
+        if not matched:
+            raise _api_error(NotFoundError, 404, "index_not_found_exception")
+        return matched
+
+    def _docs(self, index: Optional[str]) -> Iterable[_Doc]:
+        for name in self._resolve(index):
+            yield from self._indices[name].docs.values()
+
+    def _put(self, index: str, doc_id: str, source: Dict[str, Any]) -> str:
+        self._create_index(index)
+        shard = self._indices[index]
+        existing = shard.get(doc_id)
+        shard.put(_Doc(doc_id, source, next(self._seq), index, existing.seq_no + 1 if existing else 0))
+        return "updated" if existing else "created"
+
+    # single-document APIs
+    async def index(
+        self, index: str, id: str, document: Dict[str, Any], if_seq_no: Optional[int] = None, **kwargs
+    ) -> _Response:
+        await self._delay()
+        self._count("index")
+        name = self._resolve(index)[0] if index in self.aliases else index
+        if if_seq_no is not None:
+            # Optimistic concurrency: the write only applies to the version the caller read
+            existing = self._indices[name].get(id) if name in self._indices else None
+            if existing is None or existing.seq_no != if_seq_no:
+                raise _api_error(ConflictError, 409, "version_conflict_engine_exception")
+        result = self._put(name, id, dict(document))
+        return _Response({"_id": id, "result": result})
+
+    async def create(self, index: str, id: str, document: Dict[str, Any], **kwargs) -> _Response:
+        await self._delay()
+        self._count("index")
+        if index in self._indices and id in self._indices[index]:
+            raise _api_error(ConflictError, 409, "version_conflict_engine_exception")
+        self._put(index, id, dict(document))
+        return _Response({"_id": id, "result": "created"})
+
+    async def get(self, index: str, id: str, **kwargs) -> _Response:
+        await self._delay()
+        self._count("get")
+        for name in self._resolve(index) if (index in self._indices or index in self.aliases) else []:
+            doc = self._indices[name].get(id)
+            if doc:
+                return _Response({"_id": id, "_index": name, "_source": doc.source, "_seq_no": doc.seq_no, "_primary_term": 1})
+        raise _api_error(NotFoundError, 404, "not_found")
+
+    async def delete(self, index: str, id: str, **kwargs) -> _Response:
+        await self._delay()
+        if index not in self._indices or self._indices[index].remove(id) is None:
+            raise _api_error(NotFoundError, 404, "not_found")
+        return _Response({"_id": id, "result": "deleted"})
+
+    async def bulk(self, operations: List[bytes], **kwargs) -> _Response:
+        await self._delay()
+        self._count("bulk")
+        started = time.perf_counter()
+        lines = [json.loads(line) for line in operations]
+        items = []
+        i = 0
+        while i < len(lines):
+            (op, meta), = lines[i].items()
+            body = lines[i + 1] if op != "delete" else None
+            i += 1 if op == "delete" else 2
+            index, doc_id = meta["_index"], meta["_id"]
+            if op == "update":
+                doc = self._indices[index].get(doc_id) if index in self._indices else None
+                if doc is None and body.get("doc_as_upsert"):
+                    self._put(index, doc_id, body["doc"])
+                    items.append({op: {"_index": index, "_id": doc_id, "status": 201, "result": "created"}})
+                    continue
+                if doc is None:
+                    items.append({op: {"_index": index, "_id": doc_id, "status": 404, "error": {"type": "document_missing_exception"}}})
+                    continue
+                self._put(index, doc_id, {**doc.source, **body["doc"]})
+                items.append({op: {"_index": index, "_id": doc_id, "status": 200, "result": "updated"}})
+            else:
+                result = self._put(index, doc_id, body)
+                items.append({op: {"_index": index, "_id": doc_id, "status": 201 if result == "created" else 200, "result": result}})
+        self.busy_seconds += time.perf_counter() - started
+        self.last_write_at = time.perf_counter()
+        return _Response({"errors": any(list(item.values())[0]["status"] >= 300 for item in items), "items": items})
+
+    # search APIs
+    async def open_point_in_time(self, index: str, keep_alive: str, **kwargs) -> _Response:
+        await self._delay()
+        pit_id = f"pit-{next(self._seq)}"
+        self._pits[pit_id] = {name: dict(self._indices[name].docs) for name in self._resolve(index)}
+        return _Response({"id": pit_id})
+
+    async def close_point_in_time(self, id: str, **kwargs) -> _Response:
+        self._pits.pop(id, None)
+        return _Response({"succeeded": True})
+
+    async def count(self, index: str, query: Optional[Dict[str, Any]] = None, **kwargs) -> _Response:
+        await self._delay()
+        if not query or "match_all" in query:
+            return _Response({"count": sum(len(self._indices[name]) for name in self._resolve(index))})
+        matcher = self._matcher(query)
+        return _Response({"count": sum(1 for doc in self._docs(index) if matcher(doc)[0])})
+
+    def _matcher(self, query: Optional[Dict[str, Any]]) -> Callable[[_Doc], Tuple[bool, float]]:
+        if not query or "match_all" in query:
+            return lambda doc: (True, 1.0)
+        (kind, spec), = query.items()
+        if kind == "ids":
+            values = set(spec["values"])
+            return lambda doc: (doc.id in values, 1.0)
+        if kind == "term":
+            (field, value), = spec.items()
+            value = value["value"] if isinstance(value, dict) else value
+            return lambda doc: (_field_value(doc.source, field) == value, 1.0)
+        if kind == "exists":
+            return lambda doc: (_field_value(doc.source, spec["field"]) is not None, 1.0)
+        if kind == "range":
+            (field, bounds), = spec.items()
+            limits = {op: int(_parse_time(v).timestamp() * 1000) for op, v in bounds.items()}
+            def in_range(doc: _Doc) -> Tuple[bool, float]:
+                value = _sort_value(doc, field, 0.0)
+                if value is None:
+                    return False, 0.0
+                ok = all({"gte": value >= limit, "gt": value > limit, "lte": value <= limit, "lt": value < limit}[op] for op, limit in limits.items())
+                return ok, 1.0
+            return in_range
+        if kind == "bool":
+            def clauses(name: str) -> List[Callable]:
+                value = spec.get(name, [])
+                return [self._matcher(q) for q in (value if isinstance(value, list) else [value])]
+            must, filters, should, must_not = clauses("must"), clauses("filter"), clauses("should"), clauses("must_not")
+            minimum = spec.get("minimum_should_match", 0 if (must or filters) else 1)
+            def boolean(doc: _Doc) -> Tuple[bool, float]:
+                score = 0.0
+                for matcher in must + filters:
+                    ok, s = matcher(doc)
+                    if not ok:
+                        return False, 0.0
+                    score += s
+                if any(matcher(doc)[0] for matcher in must_not):
+                    return False, 0.0
+                matched = [s for ok, s in (matcher(doc) for matcher in should) if ok]
+                if should and len(matched) < minimum:
+                    return False, 0.0
+                return True, score + sum(matched)
+            return boolean
+        if kind == "multi_match":
+            terms = _tokens(spec["query"])
+            fields = {field.split('^')[0].split('.')[0] for field in spec["fields"]}
+            prefix = spec.get("type") == "bool_prefix"
+            def multi_match(doc: _Doc) -> Tuple[bool, float]:
+                doc_terms: Set[str] = set()
+                for field in fields:
+                    doc_terms.update(doc.terms[field] if field in doc.terms else _tokens(doc.source.get(field)))
+                score = 0.0
+                for i, term in enumerate(terms):
+                    if term in doc_terms:
+                        score += 1.0
+                    elif prefix and i == len(terms) - 1 and any(t.startswith(term) for t in doc_terms):
+                        score += 0.5
+                return score > 0, score
+            return multi_match
+        raise NotImplementedError(f"FakeElasticsearch does not support '{kind}' queries")
+
+    def _shards(self, index: Optional[str], pit: Optional[Dict[str, Any]]) -> List[Tuple[str, Dict[str, _Doc]]]:
+        """(index name, documents) searched: the point-in-time's snapshot, or the live indices."""
+        if pit:
+            return list(self._pits[pit["id"]].items())
+        return [(name, self._indices[name].docs) for name in self._resolve(index)]
+
+    def _matches(self, shards: List[Tuple[str, Dict[str, _Doc]]], query: Optional[Dict[str, Any]]) -> Iterator[Tuple[_Doc, float]]:
+        """(doc, score) of every match. A multi_match over tokenized fields is answered from the postings."""
+        spec = (query or {}).get("multi_match")
+        fields = {field.split('^')[0].split('.')[0] for field in spec["fields"]} if spec else set()
+        if not spec or not fields <= set(TEXT_FIELDS):
+            matcher = self._matcher(query)
+            for _, docs in shards:
+                for doc in docs.values():
+                    ok, score = matcher(doc)
+                    if ok:
+                        yield doc, score
+            return
+        terms = _tokens(spec["query"])
+        for name, docs in shards:
+            shard = self._indices.get(name)
+            if shard is None:
+                continue
+            # Postings are live, so a point-in-time only finds documents by their current terms
+            scores = shard.scores(fields, terms, spec.get("type") == "bool_prefix")
+            for doc_id, score in scores.items():
+                doc = docs.get(doc_id)
+                if doc is not None:
+                    yield doc, score
+
+    def _in_time_order(
+        self, shards: List[Tuple[str, Dict[str, _Doc]]], order: str, search_after: Optional[List[Any]]
+    ) -> Iterator[_Doc]:
+        """Live documents by (published_at, _id) in `order`, from the search_after position on."""
+        bound: Optional[Tuple[Any, ...]] = None
+        if search_after:
+            bound = tuple(search_after) if len(search_after) == 2 else (
+                (search_after[0],) if order == "desc" else (search_after[0] + 1,)
+            )
+        streams = [
+            self._indices[name].descending(bound) if order == "desc" else self._indices[name].ascending(bound)
+            for name, _ in shards
+        ]
+        for _, doc in heapq.merge(*streams, key=lambda entry: entry[0], reverse=order == "desc"):
+            yield doc
+
+    async def search(
+        self,
+        index: Optional[str] = None,
+        query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Any]] = None,
+        size: int = 10,
+        from_: Optional[int] = None,
+        search_after: Optional[List[Any]] = None,
+        track_total_hits: Any = None,
+        pit: Optional[Dict[str, Any]] = None,
+        _source: Any = True,
+        source_includes: Optional[List[str]] = None,
+        **kwargs
+    ) -> _Response:
+        await self._delay()
+        self._count("search")
+        started = time.perf_counter()
+        shards = self._shards(index, pit)
+        matcher = self._matcher(query)
+
+        sort_fields: List[Tuple[str, str]] = []
+        for clause in sort or [{"_score": "desc"}]:
+            if isinstance(clause, str):
+                sort_fields.append((clause, "asc"))
+            else:
+                (field, order), = clause.items()
+                sort_fields.append((field, order if isinstance(order, str) else order.get("order", "asc")))
+        if pit and not any(field == "_shard_doc" for field, _ in sort_fields):
+            sort_fields.append(("_shard_doc", "asc")) # PIT searches get an implicit tiebreaker
+
+        def values(item: Tuple[_Doc, float]) -> List[Any]:
+            return [_sort_value(item[0], field, item[1]) for field, _ in sort_fields]
+
+        def compare(a: List[Any], b: List[Any]) -> int:
+            for (_, order), x, y in zip(sort_fields, a, b):
+                if x == y:
+                    continue
+                if x is None or y is None: # missing values sort last
+                    return 1 if x is None else -1
+                result = -1 if x < y else 1
+                return result if order == "asc" else -result
+            return 0
+
+        start = from_ or 0
+        order = sort_fields[0][1]
+        in_time_order = (
+            not pit
+            and [field for field, _ in sort_fields] in (["published_at"], ["published_at", "video_id"])
+            and all(o == order for _, o in sort_fields)
+            and (search_after is None or isinstance(search_after[0], int))
+        )
+        total: Optional[int] = None
+        if in_time_order:
+            # Walk the index order from the search_after position and stop once the page is full
+            page = []
+            skipped = 0
+            for doc in self._in_time_order(shards, order, search_after):
+                ok, score = matcher(doc)
+                if not ok:
+                    continue
+                if skipped < start:
+                    skipped += 1
+                    continue
+                page.append((values((doc, score)), (doc, score)))
+                if len(page) == size:
+                    break
+            if track_total_hits:
+                # Totals ignore search_after; a bounded total stops counting one past its limit
+                cap = None if track_total_hits is True else int(track_total_hits) + 1
+                if not query or "match_all" in query:
+                    total = sum(len(docs) for _, docs in shards)
+                else:
+                    total = sum(1 for _ in itertools.islice(
+                        (doc for _, docs in shards for doc in docs.values() if matcher(doc)[0]), cap
+                    ))
+        elif sort_fields in ([("_score", "desc")], [("_score", "desc"), ("_shard_doc", "asc")]):
+            # Relevance order: (-score, seq) tuples select the page without a comparator, ties in write order.
+            # Matches are streamed rather than collected, which keeps the garbage collector out of large result sets.
+            after = None
+            if search_after is not None:
+                after = (-search_after[0], search_after[1] if len(search_after) > 1 else math.inf)
+            counted = [0]
+            def keyed() -> Iterator[Tuple[float, int, _Doc]]:
+                for doc, score in self._matches(shards, query):
+                    counted[0] += 1
+                    if after is None or (-score, doc.seq) > after:
+                        yield -score, doc.seq, doc
+            page = [(values((doc, -neg)), (doc, -neg)) for neg, _, doc in heapq.nsmallest(start + size, keyed())[start:]]
+            total = counted[0]
+        else:
+            matches = list(self._matches(shards, query))
+            total = len(matches)
+            keyed = [(values(item), item) for item in matches]
+            if search_after is not None:
+                keyed = [entry for entry in keyed if compare(entry[0], search_after) > 0]
+            page = heapq.nsmallest(start + size, keyed, key=cmp_to_key(lambda a, b: compare(a[0], b[0])))[start:]
+
+        hits = []
+        for sort_values, (doc, score) in page:
+            hit: Dict[str, Any] = {"_index": doc.index, "_id": doc.id, "_score": score, "sort": sort_values}
+            if source_includes:
+                hit["_source"] = {k: v for k, v in doc.source.items() if k in source_includes}
+            elif _source is True or _source is None:
+                hit["_source"] = doc.source
+            elif isinstance(_source, list):
+                hit["_source"] = {k: v for k, v in doc.source.items() if k in _source}
+            hits.append(hit)
+
+        body: Dict[str, Any] = {"hits": {"hits": hits}}
+        if track_total_hits:
+            limit = total if track_total_hits is True else min(total, int(track_total_hits))
+            body["hits"]["total"] = {"value": limit, "relation": "eq" if limit == total else "gte"}
+        if pit:
+            body["pit_id"] = pit["id"]
+        self.busy_seconds += time.perf_counter() - started
+        return _Response(body)
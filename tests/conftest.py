@@ -0,0 +1,51 @@
+"""Shared setup: app settings are read at import, so the environment is fixed before any app module loads."""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="yt-tests-")
+os.environ.update({
+    "YOUTUBE_API_KEYS": "test-key-1,test-key-2",
+    "SEARCH_QUERIES": "cricket",
+    "INGEST_STATE_PATH": os.path.join(_workdir, "ingest_state.json"),
+    "WRITE_JOURNAL_PATH": os.path.join(_workdir, "write_journal.ndjson"),
+    "YOUTUBE_MAX_PAGES_PER_FETCH": "2",
+    "WRITE_RETRY_MAX_ATTEMPTS": "2",
+    "WRITE_RETRY_BASE_SECONDS": "0.01",
+    "ENRICH_ENABLED": "false",
+    "METRICS_ENABLED": "false",
+    "EXPORT_BATCH_SIZE": "2",
+})
+
+from app import es_utils, state_utils, write_queue # noqa: E402
+from benchmarks.fakes import FakeElasticsearch # noqa: E402
+
+
+async def wait_until(predicate, timeout: float = 5.0):
+    """Polls `predicate` until it holds, failing the test after `timeout` seconds."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def es(tmp_path, monkeypatch) -> FakeElasticsearch:
+    """A fresh FakeElasticsearch, write-behind queue and ingest state for each test."""
+    fake = FakeElasticsearch()
+    monkeypatch.setattr(es_utils, "es_client", fake)
+    monkeypatch.setattr(state_utils, "INGEST_STATE_PATH", str(tmp_path / "ingest_state.json"))
+    monkeypatch.setattr(state_utils, "_save_lock", asyncio.Lock())
+    monkeypatch.setattr(write_queue, "writer", write_queue.WriteBehindQueue(10, str(tmp_path / "write_journal.ndjson")))
+    state_utils.topic_watermarks.clear()
+    state_utils.topic_resume.clear()
+    state_utils.seen_ids.clear()
+    asyncio.run(_create_indices())
+    return fake
+
+
+async def _create_indices():
+    await es_utils.ensure_index_exists()
+    await es_utils.ensure_meta_index_exists()
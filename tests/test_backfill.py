@@ -0,0 +1,86 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import backfill, es_utils, yt_utils
+from benchmarks.fakes import FakeYouTube
+
+
+def test_plan_windows_cover_the_range_newest_first():
+    since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    until = datetime(2024, 1, 3, 6, tzinfo=timezone.utc)
+    windows = backfill.plan_windows(since, until, timedelta(days=1))
+    assert windows == [
+        (datetime(2024, 1, 2, 6, tzinfo=timezone.utc), until),
+        (datetime(2024, 1, 1, 6, tzinfo=timezone.utc), datetime(2024, 1, 2, 6, tzinfo=timezone.utc)),
+        (since, datetime(2024, 1, 1, 6, tzinfo=timezone.utc))
+    ]
+    assert backfill.plan_windows(until, until, timedelta(days=1)) == []
+
+
+def test_interrupted_backfill_resumes_from_its_checkpoint(es, tmp_path, monkeypatch):
+    # One video a second for the last hour; the backfill covers 30 minutes of it, well in the past
+    youtube = FakeYouTube(["cricket"], videos_per_minute=60, backlog=3600, latency_ms=0)
+    monkeypatch.setattr(yt_utils, "http_client", youtube.client())
+    monkeypatch.setattr(yt_utils, "key_scheduler", yt_utils.ApiKeyScheduler(["test-key-1", "test-key-2"], 10000))
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    since, until = now - timedelta(minutes=40), now - timedelta(minutes=10)
+    checkpoint_path = str(tmp_path / "backfill_cricket.json")
+    expected = {
+        youtube._video_id(0, n)
+        for n in range(youtube._oldest_index_after(since.timestamp()), youtube._newest_index_before(until.timestamp()) + 1)
+    }
+
+    def make_run(max_units: int, run_until=until) -> backfill.BackfillRun:
+        run = backfill.BackfillRun(
+            topic="cricket",
+            since=since,
+            until=run_until,
+            window=timedelta(minutes=10),
+            concurrency=2,
+            max_units=max_units,
+            max_pages_per_window=2, # 600 videos a window, so every window is narrowed and re-queued
+            checkpoint_path=checkpoint_path
+        )
+        run.load_or_plan()
+        return run
+
+    async def indexed_ids():
+        videos, _, _, cursor = await es_utils.get_videos_paginated(page=1, size=50)
+        ids = [video["video_id"] for video in videos]
+        while cursor:
+            videos, _, _, cursor = await es_utils.get_videos_paginated(page=1, size=50, cursor=cursor)
+            ids += [video["video_id"] for video in videos]
+        return ids
+
+    async def scenario():
+        first = make_run(max_units=5 * yt_utils.SEARCH_LIST_COST)
+        assert len(first.pending) == 3
+        summary = await first.run()
+        assert summary["out_of_quota"] and summary["units_spent"] == 500 and summary["windows_left"]
+        with open(checkpoint_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["units_spent"] == 500 and len(saved["pending"]) == summary["windows_left"]
+        assert set(await indexed_ids()) < expected
+
+        # Another range cannot pick up this checkpoint
+        with pytest.raises(ValueError):
+            make_run(max_units=10000, run_until=until - timedelta(minutes=1))
+
+        # The resumed run only walks what is still pending, and together they index the whole range
+        second = make_run(max_units=20000, run_until=None) # the end time comes from the checkpoint
+        assert second.until == until and second.pending == [
+            (backfill._parse_time(start), backfill._parse_time(end)) for start, end in saved["pending"]
+        ]
+        try:
+            summary = await second.run()
+        finally:
+            await yt_utils.close_http_client()
+        assert summary["windows_left"] == 0 and not summary["out_of_quota"] and summary["failed_windows"] == 0
+        ids = await indexed_ids()
+        assert set(ids) == expected and len(ids) == len(expected)
+        assert youtube.calls["search"] * yt_utils.SEARCH_LIST_COST == summary["units_spent"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app import es_utils
+from app.main import app
+from app.pydantic_models import Video
+
+
+def seed(count: int):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    asyncio.run(es_utils.bulk_index_videos([
+        Video(
+            video_id=f"v{i}",
+            title=f"cricket {i}",
+            description="test video",
+            published_at=now - timedelta(minutes=i),
+            thumbnails=f"https://i.ytimg.com/vi/v{i}/mqdefault.jpg",
+            topic="cricket"
+        )
+        for i in range(count)
+    ]))
+
+
+async def export(headers: dict) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app) # no lifespan: the fake is already wired in
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/videos/export", headers=headers)
+        await response.aread()
+        return response
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "identity"])
+def test_export_streams_every_video(es, encoding):
+    seed(6)
+    response = asyncio.run(export({"Accept-Encoding": encoding}))
+    # httpx decodes the gzip body, failing on a stream without its trailer
+    assert (response.headers.get("content-encoding") == "gzip") == (encoding == "gzip")
+    assert sorted(json.loads(line)["video_id"] for line in response.content.splitlines()) == [f"v{i}" for i in range(6)]
+    assert not es._pits
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "identity"])
+def test_export_aborts_instead_of_ending_cleanly_when_elasticsearch_fails(es, encoding):
+    seed(6)
+    original_search = es.search
+    pit_searches = []
+
+    async def search(**kwargs):
+        if kwargs.get("pit"):
+            pit_searches.append(kwargs)
+            if len(pit_searches) == 2:
+                raise ConnectionError("Elasticsearch went away")
+        return await original_search(**kwargs)
+
+    es.search = search
+    # The server must not finish the response (no terminating chunk, no gzip trailer) after a failed slice
+    with pytest.raises(ConnectionError):
+        asyncio.run(export({"Accept-Encoding": encoding}))
+    assert not es._pits # the export's point-in-time is still closed
@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app import fetcher, state_utils, write_queue, yt_utils
+from benchmarks.fakes import FakeYouTube
+from tests.conftest import wait_until
+
+
+def test_truncated_walk_keeps_watermark_and_resumes_without_gaps(es, monkeypatch):
+    # One video a second, so the last 300 seconds hold ~300 videos: six pages against a budget of two
+    youtube = FakeYouTube(["cricket"], videos_per_minute=60, backlog=2000, latency_ms=0)
+    monkeypatch.setattr(yt_utils, "http_client", youtube.client())
+    watermark = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(seconds=300)
+    state_utils.topic_watermarks["cricket"] = watermark
+    # Everything published after the watermark's second when the first walk starts must end up indexed
+    expected = {
+        youtube._video_id(0, n)
+        for n in range(youtube._oldest_index_after(watermark.timestamp() + 1), youtube._newest_index_before(datetime.now(timezone.utc).timestamp()) + 1)
+    }
+
+    async def poll() -> int:
+        writer = write_queue.writer
+        queued = await fetcher.fetch_topic("cricket", asyncio.Semaphore(1))
+        # The walk's progress is recorded behind its batches, so wait until the writer has processed them all
+        await wait_until(lambda: writer.stats()["queued_batches"] == 0 and not writer._held)
+        return queued
+
+    async def scenario():
+        write_queue.writer.start()
+        try:
+            assert await poll() == 100
+            assert state_utils.topic_watermarks["cricket"] == watermark
+            before, newest = state_utils.topic_resume["cricket"]
+            assert watermark < before < newest
+
+            for _ in range(5):
+                if "cricket" not in state_utils.topic_resume:
+                    break
+                await poll()
+                # Draining the older range does not move the watermark until it is complete
+                if "cricket" in state_utils.topic_resume:
+                    assert state_utils.topic_watermarks["cricket"] == watermark
+            assert "cricket" not in state_utils.topic_resume
+            assert state_utils.topic_watermarks["cricket"] == newest
+        finally:
+            await write_queue.writer.stop()
+            await yt_utils.close_http_client()
+
+    asyncio.run(scenario())
+
+    indexed = {doc.id for shard in es._indices.values() for doc in shard.docs.values() if doc.source.get("topic") == "cricket"}
+    assert expected <= indexed
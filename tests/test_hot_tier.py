@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app import es_utils
+from app.hot_tier import HotTier
+from app.pydantic_models import Video
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def make_video(video_id: str, minutes_ago: int, title: str = "cricket") -> Video:
+    return Video(
+        video_id=video_id,
+        title=title,
+        description="test video",
+        published_at=NOW - timedelta(minutes=minutes_ago),
+        thumbnails=f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg",
+        topic="cricket"
+    )
+
+
+async def index(tier: HotTier, videos):
+    result = await es_utils.bulk_index_videos(videos)
+    tier.add([video for video in videos if video.video_id in result.indexed], created_count=len(result.created))
+
+
+async def es_order():
+    videos, total, _, cursor = await es_utils.get_videos_paginated(page=1, size=50)
+    ids = [video["video_id"] for video in videos]
+    while cursor:
+        videos, _, _, cursor = await es_utils.get_videos_paginated(page=1, size=50, cursor=cursor)
+        ids += [video["video_id"] for video in videos]
+    return ids, total
+
+
+def test_hot_tier_stays_the_newest_prefix_of_the_index(es):
+    tier = HotTier(capacity=5)
+
+    async def scenario():
+        # Two videos per minute, so pages break inside a published_at and need the video_id tiebreak
+        await es_utils.bulk_index_videos([make_video(f"v{i:02d}", 10 + i // 2) for i in range(8)])
+        await tier.warm()
+        assert len(tier) == 5 and tier.total == 8
+
+        await index(tier, [make_video("new1", 1), make_video("new2", 2)])
+        await index(tier, [make_video("v00", 10, title="cricket retitled")]) # an update, not a new document
+        await index(tier, [make_video("old", 500)]) # older than everything held: stays out of the ring
+        ids, total = await es_order()
+        assert (tier.total, len(tier)) == (total, 5) == (11, 5)
+        for page in (1, 2):
+            videos, page_total, _ = tier.page(page, 2)
+            assert [video["video_id"] for video in videos] == ids[(page - 1) * 2:page * 2]
+            assert page_total == total
+        assert {video["video_id"]: video["title"] for video in tier.page(1, 5)[0]}["v00"] == "cricket retitled"
+        assert tier.page(3, 2) is None # needs a sixth video the ring does not hold
+
+    asyncio.run(scenario())
+
+
+def test_hot_tier_cursor_continues_through_elasticsearch(es):
+    tier = HotTier(capacity=6)
+
+    async def scenario():
+        await es_utils.bulk_index_videos([make_video(f"v{i:02d}", 10 + i // 3) for i in range(15)])
+        await tier.warm()
+        await index(tier, [make_video("new1", 1)])
+        ids, _ = await es_order()
+
+        videos, _, cursor = tier.page(2, 3)
+        walked = [video["video_id"] for video in tier.page(1, 3)[0] + videos]
+        pages = []
+        while cursor:
+            videos, _, page, cursor = await es_utils.get_videos_paginated(page=1, size=3, cursor=cursor)
+            walked += [video["video_id"] for video in videos]
+            pages.append(page)
+        assert walked == ids and len(set(walked)) == 16
+        assert pages == [3, 4, 5, 6]
+
+    asyncio.run(scenario())
+
+
+def test_small_index_is_held_whole(es):
+    tier = HotTier(capacity=10)
+
+    async def scenario():
+        await es_utils.bulk_index_videos([make_video("a", 5), make_video("b", 6)])
+        await tier.warm()
+        # The ring holds the whole index, so even an older video joins it and pages past the end are empty
+        await index(tier, [make_video("c", 100)])
+        videos, total, cursor = tier.page(1, 10)
+        assert [video["video_id"] for video in videos] == ["a", "b", "c"] and total == 3 and cursor is None
+        assert tier.page(2, 10) == ([], 3, None)
+
+    asyncio.run(scenario())
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+# prometheus_client picks multiprocess mode when it is imported, so each "API process" is a fresh interpreter
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVE = """
+from app import metrics
+metrics.HTTP_REQUEST_SECONDS.labels("GET", "/videos", "200").observe(0.01)
+metrics.inc(metrics.VIDEOS_INDEXED, {count}, "cricket")
+metrics.mark_process_dead()
+"""
+SCRAPE = """
+from app import metrics
+print(metrics.render().decode())
+"""
+
+
+def run(code: str, multiproc_dir: str) -> str:
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": multiproc_dir, "METRICS_ENABLED": "true"}
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+
+
+def test_scrape_sums_every_api_process(tmp_path):
+    for count in (3, 4):
+        run(SERVE.format(count=count), str(tmp_path))
+    scraped = run(SCRAPE, str(tmp_path))
+    assert 'yt_videos_indexed_total{topic="cricket"} 7.0' in scraped
+    assert 'yt_http_request_seconds_count{method="GET",route="/videos",status="200"} 2.0' in scraped
+    assert "yt_ingest_lag_seconds" not in scraped # exported by the worker only
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app import config, es_utils
+from app.main import app
+from app.pydantic_models import Video
+
+
+def seed(count: int, same_second: int = 1):
+    """Indexes `count` cricket videos; every `same_second` of them share a published_at, to exercise tiebreaks."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    videos = [
+        Video(
+            video_id=f"v{i:03d}",
+            title=f"cricket match {i} highlights",
+            description="test video",
+            published_at=now - timedelta(seconds=i // same_second),
+            thumbnails=f"https://i.ytimg.com/vi/v{i:03d}/mqdefault.jpg",
+            topic="cricket"
+        )
+        for i in range(count)
+    ]
+    asyncio.run(es_utils.bulk_index_videos(videos))
+
+
+def test_cursor_encoding_round_trips():
+    state = {"k": "videos", "after": [1718000000000, "v001"], "page": 3}
+    assert es_utils.decode_cursor(es_utils.encode_cursor(state)) == state
+    with pytest.raises(es_utils.InvalidCursorError):
+        es_utils.decode_cursor("not a cursor")
+
+
+def test_videos_cursor_walk_matches_page_order(es):
+    seed(35, same_second=3)
+
+    async def scenario():
+        pages = [await es_utils.get_videos_paginated(page=page, size=10) for page in (1, 2, 3, 4)]
+        by_page = [video["video_id"] for videos, _, _, _ in pages for video in videos]
+
+        videos, total, page, cursor = pages[0]
+        walked = [video["video_id"] for video in videos]
+        numbers = [page]
+        while cursor:
+            videos, total, page, cursor = await es_utils.get_videos_paginated(page=1, size=10, cursor=cursor)
+            walked += [video["video_id"] for video in videos]
+            numbers.append(page)
+        return by_page, walked, numbers
+
+    by_page, walked, numbers = asyncio.run(scenario())
+    assert len(walked) == len(set(walked)) == 35
+    assert walked == by_page
+    assert numbers == [1, 2, 3, 4]
+
+
+def test_search_cursor_reuses_point_in_time_and_rejects_other_queries(es):
+    seed(25)
+
+    async def scenario():
+        videos, total, page, cursor = await es_utils.search_videos("cricket", 10, track_total=True)
+        assert total == 25 and len(es._pits) == 1
+        seen = [video["video_id"] for video in videos]
+        while cursor:
+            videos, _, page, cursor = await es_utils.search_videos("Cricket ", 10, cursor=cursor)
+            seen += [video["video_id"] for video in videos]
+            assert len(es._pits) == 1 # every page reads the same point-in-time
+        assert len(seen) == len(set(seen)) == 25 and page == 3
+
+        _, _, _, cursor = await es_utils.search_videos("cricket", 10)
+        with pytest.raises(es_utils.InvalidCursorError):
+            await es_utils.search_videos("football", 10, cursor=cursor)
+        with pytest.raises(es_utils.InvalidCursorError):
+            await es_utils.get_videos_paginated(page=1, size=10, cursor=cursor)
+
+        # A search that fits on one page hands out no cursor and closes its point-in-time
+        pits = len(es._pits)
+        _, _, _, cursor = await es_utils.search_videos("match 7", 50)
+        assert cursor is None and len(es._pits) == pits
+
+    asyncio.run(scenario())
+
+
+def test_search_fails_instead_of_returning_empty_when_point_in_time_cannot_open(es, monkeypatch):
+    seed(5)
+    open_point_in_time = es.open_point_in_time
+
+    async def unavailable(**kwargs):
+        raise ConnectionError("Elasticsearch went away")
+
+    async def search() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/search", params={"q": "highlights", "size": 2})
+
+    monkeypatch.setattr(es, "open_point_in_time", unavailable)
+    assert asyncio.run(search()).status_code == 500
+
+    # Nothing was cached for the failed request
+    monkeypatch.setattr(es, "open_point_in_time", open_point_in_time)
+    response = asyncio.run(search())
+    assert response.status_code == 200 and len(response.json()["videos"]) == 2
+
+
+def test_search_cache_ttl_stays_below_point_in_time_keep_alive():
+    assert config._parse_time_value("1m") == 60
+    assert config._parse_time_value("500ms") == 0.5
+    assert config._parse_time_value("soon") is None
+    assert config.SEARCH_CACHE_TTL_SECONDS <= config._parse_time_value(config.SEARCH_PIT_KEEP_ALIVE) / 2
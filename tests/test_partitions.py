@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app import es_utils
+from app.pydantic_models import Video
+
+
+def test_partition_bounds_cover_each_month():
+    assert es_utils.partition_index_name(datetime(2024, 12, 31, 23, 59, tzinfo=timezone.utc)) == "youtube_videos-2024.12"
+    assert es_utils.partition_bounds("youtube_videos-2024.12") == (
+        datetime(2024, 12, 1, tzinfo=timezone.utc), datetime(2025, 1, 1, tzinfo=timezone.utc)
+    )
+    assert es_utils.partition_bounds("youtube_videos-2024.02")[1] == datetime(2024, 3, 1, tzinfo=timezone.utc)
+    assert es_utils.partition_bounds("youtube_videos-archive") is None
+
+
+def test_drop_expired_partitions_keeps_recent_and_unrecognized_indices(es):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    ages = [0, 40, 100, 400]
+    asyncio.run(es_utils.bulk_index_videos([
+        Video(
+            video_id=f"v{days}",
+            title=f"cricket {days} days ago",
+            description="test video",
+            published_at=now - timedelta(days=days),
+            thumbnails=f"https://i.ytimg.com/vi/v{days}/mqdefault.jpg",
+            topic="cricket"
+        )
+        for days in ages
+    ]))
+    asyncio.run(es.indices.create(index="youtube_videos-archive")) # matches the pattern, but not a period
+    partitions = {es_utils.partition_index_name(now - timedelta(days=days)) for days in ages}
+    cutoff = now - timedelta(days=60)
+    expected = sorted(name for name in partitions if es_utils.partition_bounds(name)[1] <= cutoff)
+    assert expected # the 100 and 400 day old partitions at least
+
+    assert asyncio.run(es_utils.drop_expired_partitions(0)) == []
+    assert asyncio.run(es_utils.drop_expired_partitions(60)) == expected
+    remaining = set(asyncio.run(es.indices.get_alias(index=es_utils.PARTITION_PATTERN, name="youtube_videos")).keys())
+    assert remaining == (partitions - set(expected)) | {"youtube_videos-archive"}
+    assert es_utils.partition_index_name(now) in remaining
+    # Every video in a kept partition is still there
+    videos, _, _, _ = asyncio.run(es_utils.get_videos_paginated(page=1, size=10))
+    assert {video["video_id"] for video in videos} == {
+        f"v{days}" for days in ages if es_utils.partition_index_name(now - timedelta(days=days)) in remaining
+    }
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from app import state_utils, yt_utils
+
+
+def test_a_stale_leader_cannot_move_the_checkpoint_back(es):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    async def scenario():
+        # The new leader finished a walk for cricket and cut one short for chess
+        state_utils.topic_watermarks.update({"cricket": now, "chess": now - timedelta(hours=2)})
+        state_utils.topic_resume["chess"] = (now - timedelta(minutes=30), now)
+        await state_utils.save_state()
+
+        # The old leader, still stopping, saves what it knew: older watermarks and a resume point since drained
+        state_utils.topic_watermarks.clear()
+        state_utils.topic_resume.clear()
+        state_utils.topic_watermarks.update({"cricket": now - timedelta(hours=1), "tennis": now - timedelta(hours=1)})
+        state_utils.topic_resume["cricket"] = (now - timedelta(minutes=90), now - timedelta(minutes=61))
+        await state_utils.save_state()
+
+    asyncio.run(scenario())
+    with open(state_utils.INGEST_STATE_PATH, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["watermarks"] == {
+        "cricket": now.isoformat(),
+        "chess": (now - timedelta(hours=2)).isoformat(),
+        "tennis": (now - timedelta(hours=1)).isoformat()
+    }
+    assert saved["resume"] == {"chess": [(now - timedelta(minutes=30)).isoformat(), now.isoformat()]}
+
+    assert state_utils.load_state()
+    assert state_utils.topic_watermarks["cricket"] == now
+    assert "cricket" not in state_utils.topic_resume
+
+
+def test_key_usage_survives_a_leader_handover(es, monkeypatch):
+    keys = ["test-key-aaaa-1", "test-key-bbbb-2"]
+    old_leader = yt_utils.ApiKeyScheduler(keys, 1000)
+    monkeypatch.setattr(yt_utils, "key_scheduler", old_leader)
+
+    async def scenario():
+        assert old_leader.acquire(300) == keys[0]
+        old_leader.mark_exhausted(keys[1])
+        state_utils.seen_ids.add(["v1"])
+        await state_utils.save_state()
+
+        # A backfill that restored the same usage and spent more saves only its key usage
+        backfill = yt_utils.ApiKeyScheduler(keys, 1000)
+        monkeypatch.setattr(yt_utils, "key_scheduler", backfill)
+        state_utils.load_key_usage()
+        assert backfill.acquire(200) == keys[0]
+        await state_utils.save_key_usage()
+
+    asyncio.run(scenario())
+    with open(state_utils.INGEST_STATE_PATH, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["seen_ids"] == ["v1"]
+    assert not any(key in json.dumps(saved) for key in keys)
+
+    new_leader = yt_utils.ApiKeyScheduler(keys, 1000)
+    monkeypatch.setattr(yt_utils, "key_scheduler", new_leader)
+    assert state_utils.load_state()
+    states = {state.key: state for state in new_leader.states()}
+    first, second = (states[yt_utils._mask_key(key)] for key in keys)
+    assert (first.used_units, first.requests) == (500, 2)
+    assert second.forbidden_count == 1 and second.cooldown_until == yt_utils.next_quota_reset()
+    assert new_leader.total_remaining() == 500
+
+
+def test_key_usage_from_an_earlier_quota_day_is_ignored():
+    keys = ["test-key-aaaa-1"]
+    scheduler = yt_utils.ApiKeyScheduler(keys, 1000)
+    scheduler.acquire(300)
+    snapshot = scheduler.snapshot()
+    snapshot["quota_day"] = "2000-01-01"
+
+    restored = yt_utils.ApiKeyScheduler(keys, 1000)
+    restored.restore(snapshot)
+    assert restored.total_remaining() == 1000
+    assert yt_utils.merge_key_usage(snapshot, restored.snapshot())["keys"][yt_utils._key_id(keys[0])]["used"] == 0
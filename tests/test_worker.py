@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from app import es_utils, fetcher, state_utils, worker
+
+
+def test_lease_is_exclusive_until_it_expires(es):
+    async def scenario():
+        assert await es_utils.acquire_lease("lease", "a", ttl_seconds=0.2)
+        assert not await es_utils.acquire_lease("lease", "b", ttl_seconds=0.2)
+        assert await es_utils.acquire_lease("lease", "a", ttl_seconds=0.2) # renewal
+        await asyncio.sleep(0.25)
+        assert await es_utils.acquire_lease("lease", "b", ttl_seconds=0.2)
+        assert not await es_utils.acquire_lease("lease", "a", ttl_seconds=0.2)
+        assert (await es_utils.get_lease("lease"))["holder"] == "b"
+
+        await es_utils.release_lease("lease", "a") # not the holder: no effect
+        assert (await es_utils.get_lease("lease"))["holder"] == "b"
+        await es_utils.release_lease("lease", "b")
+        assert await es_utils.get_lease("lease") is None
+
+    asyncio.run(scenario())
+
+
+def test_one_of_several_racing_workers_takes_an_expired_lease(es):
+    es.latency = 0.002 # lets the racers' get and conditional write interleave
+
+    async def scenario():
+        assert await es_utils.acquire_lease("lease", "old", ttl_seconds=0.05)
+        await asyncio.sleep(0.1)
+        won = await asyncio.gather(*(es_utils.acquire_lease("lease", f"w{i}", ttl_seconds=5) for i in range(5)))
+        assert sum(won) == 1
+        assert (await es_utils.get_lease("lease"))["holder"] == f"w{won.index(True)}"
+
+    asyncio.run(scenario())
+
+
+def test_leader_stops_before_a_standby_could_take_the_lease(es, monkeypatch):
+    ttl, safety = 0.5, 0.2
+    monkeypatch.setattr(worker, "FETCHER_LEASE_TTL_SECONDS", ttl)
+    monkeypatch.setattr(worker, "FETCHER_LEASE_SAFETY_SECONDS", safety)
+    monkeypatch.setattr(worker, "FETCHER_LEASE_RENEW_SECONDS", 0.05)
+    monkeypatch.setattr(worker, "ES_PARTITION_MAINTENANCE_SECONDS", 3600)
+    monkeypatch.setattr(state_utils, "load_state", lambda: False)
+    attempts = []
+    stopped = []
+
+    async def acquire_lease(*args, **kwargs):
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            await asyncio.sleep(0.04) # a slow but successful renewal
+            return True
+        raise ConnectionError("Elasticsearch unreachable")
+
+    async def periodic_fetch():
+        try:
+            await fetcher.shutdown_event.wait()
+        finally: # stopped or cancelled
+            stopped.append(time.monotonic())
+
+    monkeypatch.setattr(es_utils, "acquire_lease", acquire_lease)
+    monkeypatch.setattr(fetcher, "periodic_fetch", periodic_fetch)
+
+    async def scenario():
+        stop_event = asyncio.Event()
+        loop = asyncio.create_task(worker.run_leader_loop(stop_event))
+        await asyncio.sleep(ttl + 0.3)
+        stop_event.set()
+        await loop
+
+    asyncio.run(scenario())
+    # Standbys see the lease expire at (time the request was sent) + TTL
+    assert stopped and stopped[0] < attempts[0] + ttl
+
+
+def test_stop_fetch_task_cancels_after_the_time_left_on_the_lease():
+    async def scenario():
+        fetcher.shutdown_event.clear()
+        task = asyncio.create_task(asyncio.sleep(10)) # ignores the shutdown event
+        started = time.monotonic()
+        await worker.stop_fetch_task(task, 0.05)
+        assert task.cancelled() and time.monotonic() - started < 1
+        await worker.stop_fetch_task(asyncio.create_task(asyncio.sleep(10)), -1.0) # lease already gone
+
+    asyncio.run(scenario())
@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+
+from elasticsearch import ConnectionTimeout
+
+from app import state_utils, write_queue
+from app.pydantic_models import TopicProgress, Video
+from tests.conftest import wait_until
+
+
+def make_video(video_id: str, published_at: datetime) -> Video:
+    return Video(
+        video_id=video_id,
+        title=f"cricket {video_id}",
+        description="test video",
+        published_at=published_at,
+        thumbnails=f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg",
+        topic="cricket"
+    )
+
+
+def test_outage_is_journaled_and_replayed_in_order(es):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    first = [make_video("a1", now - timedelta(minutes=2)), make_video("a2", now - timedelta(minutes=1))]
+    second = [make_video("b1", now)]
+    written_batches = []
+    original_bulk = es.bulk
+    outage = {"on": True}
+
+    async def bulk(operations, **kwargs):
+        if outage["on"]:
+            raise ConnectionTimeout("timed out")
+        response = await original_bulk(operations=operations, **kwargs)
+        written_batches.append([list(item.values())[0]["_id"] for item in response["items"]])
+        return response
+
+    es.bulk = bulk
+
+    async def scenario():
+        writer = write_queue.writer
+        writer.start()
+        await writer.submit("cricket", first, progress=TopicProgress(watermark=first[-1].published_at))
+        await writer.submit("cricket", second, progress=TopicProgress(watermark=second[-1].published_at))
+        await wait_until(lambda: writer.spilled == 2)
+        await writer.stop()
+
+        # Both batches are durable in the journal (or its replay file), so their progress is already recorded
+        journaled = sorted(
+            write_queue._read_batches(writer.replay_path) + write_queue._read_batches(writer.journal_path),
+            key=lambda batch: batch.seq
+        )
+        assert [[video.video_id for video in batch.videos] for batch in journaled] == [["a1", "a2"], ["b1"]]
+        assert state_utils.topic_watermarks["cricket"] == now
+        assert writer.pending_ids == set()
+
+        # The next writer (after a restart or a leader change) replays the journal in order
+        outage["on"] = False
+        writer.start()
+        try:
+            await wait_until(lambda: writer.replayed == 2 and not writer.stats()["journal_pending"])
+        finally:
+            await writer.stop()
+
+    asyncio.run(scenario())
+
+    assert written_batches == [["a1", "a2"], ["b1"]]
+    assert write_queue.writer.written == 3
+    assert all(video_id in state_utils.seen_ids for video_id in ("a1", "a2", "b1"))
+
+
+def _append_from_other_process(journal_path: str, count: int):
+    """A stopping leader journaling its leftovers, one batch at a time."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    for i in range(count):
+        batch = write_queue.IndexBatch(seq=i + 1, topic="cricket", videos=[make_video(f"old{i:03d}", now)])
+        write_queue._append_lines(journal_path, [batch.model_dump_json()])
+
+
+def test_journal_appends_from_another_process_survive_rotation(es):
+    writer = write_queue.writer
+    count = 200
+    context = multiprocessing.get_context("fork")
+
+    async def scenario():
+        # Seed the journal so the writer starts replaying (rotating) while the other process appends
+        _append_from_other_process(writer.journal_path, 1)
+        writer.start()
+        other = context.Process(target=_append_from_other_process, args=(writer.journal_path, count))
+        other.start()
+        try:
+            await wait_until(lambda: not other.is_alive(), timeout=30)
+            await wait_until(lambda: not writer.stats()["journal_pending"], timeout=30)
+        finally:
+            await writer.stop()
+        assert other.exitcode == 0
+
+    asyncio.run(scenario())
+    indexed = {doc.id for shard in es._indices.values() for doc in shard.docs.values()}
+    assert {f"old{i:03d}" for i in range(count)} <= indexed